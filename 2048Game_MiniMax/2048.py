@@ -1,7 +1,15 @@
 from __future__ import absolute_import, division, print_function
-import pygame, sys, time, math, random
+import pygame, sys, time, math, random, os, logging, argparse
 from pygame.locals import *
 from ai import *
+import bitboard
+import gridboard
+from ttable import TranspositionTable
+from heuristics import Evaluator
+import telemetry
+import replay
+from renderer import BoardRenderer
+from thinker import Thinker
 
 BLACK = (0, 0, 0)
 RED = (244, 67, 54)
@@ -21,7 +29,7 @@ COLORS = { 0:BLACK, 2:RED, 4:PINK, 8:PURPLE, 16:DEEP_PURPLE,
                4096:DEEP_PURPLE, 8192:DEEP_ORANGE, 16384:BROWN, 32768:TEAL}
 
 class Game:
-	def __init__(self):
+	def __init__(self, seed=None, replayPath=None):
 		self.total_points = 0
 		self.default_tile = 2
 		self.board_size = 4
@@ -30,28 +38,74 @@ class Game:
 		pygame.display.set_caption("2048")
 		self.myfont = pygame.font.SysFont("arial", 40)
 		self.scorefont = pygame.font.SysFont("arial", 30)
+		# draws only the tiles that changed, dirtyRects are the parts of the window to update
+		self.renderer = BoardRenderer(self.surface, self.myfont, self.scorefont, COLORS)
+		self.dirtyRects = []
 		self.tileMatrix = [[0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]]
 		self.undoMat = []
+		# expectimax values survive from one decision to the next
+		self.cache = TranspositionTable()
+		# seconds the AI may think per move, and the deepest it may search
+		self.timeLimit = 0.1
+		self.maxDepth = 9
+		if seed is not None:
+			# a timed search reaches a depth that depends on the machine and its
+			# load: a seeded game searches to a fixed depth so it plays the same
+			self.timeLimit = None
+			self.maxDepth = 3
+		# root moves are searched on a warm process pool when there are cores for it
+		self.pool = searchPool() if (os.cpu_count() or 1) > 1 else None
+		# leaf heuristics, they score packed 4x4 boards
+		self.evaluator = Evaluator()
+		# per-move search telemetry goes to this logger at INFO level
+		self.searchLog = logging.getLogger('2048.search')
+		self.listener = telemetry.logListener(self.searchLog)
+		# every game gets its own seed, seed, seed + 1, ..., so its tiles can be played again
+		self.nextSeed = seed if seed is not None else random.getrandbits(63)
+		self.seed = self.nextSeed
+		self.rng = random.Random(self.seed)
+		# optional append-only replay.ReplayLog of every game played
+		self.replayLog = replay.ReplayLog(replayPath) if replayPath else None
+		# the AI searches on a background thread while the window keeps drawing at this rate
+		self.thinker = Thinker()
+		# hand the GIL back to the window within a millisecond while the AI thread searches
+		sys.setswitchinterval(0.001)
+		self.clock = pygame.time.Clock()
+		self.fps = 60
 	def loop(self, fromLoaded = False):
 		auto = True
 		if not fromLoaded:
+			self.seed = self.nextSeed
+			self.nextSeed += 1
+			self.rng = random.Random(self.seed)
 			self.placeRandomTile()
 			self.placeRandomTile()
+		if self.replayLog is not None:
+			self.replayLog.startGame(self.board_size, self.seed, self.getEngine().encode(self.tileMatrix))
 		self.printMatrix()
 		while True:
 			if auto:
-				if self.checkIfCanGo():
-					#Hint: Check the use of deepcopy
-					ai = Gametree(copy.deepcopy(self.tileMatrix), 3, self.total_points)
-					direction = ai.compute_decision() 
-					self.move(direction)
+				if self.thinker.thinking():
+					direction = self.thinker.poll()
+					if direction is not None and direction >= 0:
+						self.move(direction)
+				elif self.checkIfCanGo():
+					# the search reads its matrix on the thinker thread: give it a copy,
+					# so moves and resets of the window meanwhile do not reach it
+					ai = Gametree([row[:] for row in self.tileMatrix], self.maxDepth, self.total_points, cache=self.cache,
+						pool=self.pool, evaluator=self.getEvaluator(), listener=self.getListener())
+					self.thinker.start(ai, self.timeLimit)
 				else:
 					auto = False
 					self.printGameOver()
 			for event in pygame.event.get():
 				if event.type == QUIT:
+					self.thinker.cancel()
 					pygame.quit()
 					sys.exit()
+				if event.type == KEYDOWN:
+					# every key may change the board or stop autoplay, the search restarts if needed
+					self.thinker.cancel()
 				if event.type == KEYDOWN and event.key == K_RETURN:
 					auto = not auto
 				if self.checkIfCanGo():
@@ -73,30 +127,40 @@ class Game:
 						self.loadGameState()
 					elif event.key == pygame.K_u:
 						self.undo()
-			pygame.display.update()
+			pygame.display.update(self.dirtyRects)
+			self.dirtyRects = []
+			self.clock.tick(self.fps)
+	def getEvaluator(self):
+		if self.board_size == bitboard.SIZE:
+			return self.evaluator
+		return None
+	def getListener(self):
+		# the search is only instrumented while someone reads the telemetry
+		if self.searchLog.isEnabledFor(logging.INFO):
+			return self.listener
+		return None
+	def getEngine(self):
+		# the search engine for this board size also plays the moves
+		return gridboard.engineFor(self.board_size)
 	def move(self, direction):
 		self.addToUndo()
-		for i in range(0, direction):
-			self.rotateMatrixClockwise()
-		if self.canMove():
-			self.moveTiles()
-			self.mergeTiles()
-			self.placeRandomTile()
-		for j in range(0, (4 - direction) % 4):
-			self.rotateMatrixClockwise()
+		engine = self.getEngine()
+		board = engine.encode(self.tileMatrix)
+		newBoard, gained = engine.move(board, direction)
+		if newBoard != board:
+			self.tileMatrix = engine.decode(newBoard)
+			self.total_points += gained
+			cell, exponent = self.placeRandomTile()
+			if self.replayLog is not None:
+				self.replayLog.addMove(board, direction, cell, exponent)
+				self.replayLog.flush()
 		self.printMatrix()
 		
 	def printMatrix(self):
-		self.surface.fill(BLACK)
-		for i in range(0, self.board_size):
-			for j in range(0, self.board_size):
-				pygame.draw.rect(self.surface, COLORS[self.tileMatrix[i][j]],
-	                (i*(400/self.board_size), j*(400/self.board_size) + 100, 400/self.board_size, 400/self.board_size))
-				label = self.myfont.render(str(self.tileMatrix[i][j]), 1, (255,255,255))
-				label2 = self.scorefont.render("Score:" + str(self.total_points), 1, (255, 255, 255))
-				self.surface.blit(label, (i*(400/self.board_size) + 30, j*(400/self.board_size) + 130))
-				self.surface.blit(label2, (10, 20))
+		self.dirtyRects.extend(self.renderer.draw(self.tileMatrix, self.total_points))
 	def printGameOver(self):
+		self.renderer.invalidate()
+		self.dirtyRects.append(self.surface.get_rect())
 		self.surface.fill(BLACK)
 		label = self.scorefont.render("Game Over!", 1, (255,255,255))
 		label2 = self.scorefont.render("Score:" + str(self.total_points), 1, (255,255,255))
@@ -105,29 +169,11 @@ class Game:
 		self.surface.blit(label2, (50, 200))
 		self.surface.blit(label3, (50, 300))
 	def placeRandomTile(self):
-		while True:
-			i = random.randint(0,self.board_size-1)
-			j = random.randint(0,self.board_size-1)
-			if self.tileMatrix[i][j] == 0:
-				break
-		self.tileMatrix[i][j] = 2
-	def moveTiles(self):
-		tm = self.tileMatrix
-		for i in range(0, self.board_size):
-			for j in range(0, self.board_size - 1):
-				while tm[i][j] == 0 and sum(tm[i][j:]) > 0:
-					for k in range(j, self.board_size - 1):
-						tm[i][k] = tm[i][k + 1]
-					tm[i][self.board_size - 1] = 0
-	def mergeTiles(self):
-		tm = self.tileMatrix
-		for i in range(0, self.board_size):
-			for k in range(0, self.board_size - 1):
-				if tm[i][k] == tm[i][k + 1] and tm[i][k] != 0:
-					tm[i][k] = tm[i][k] * 2
-					tm[i][k + 1] = 0
-					self.total_points += tm[i][k]
-					self.moveTiles()
+		# a 2, or a 4 one time in ten as the search expects, drawn from the game's seeded rng
+		engine = self.getEngine()
+		board, cell, exponent = replay.spawn(engine, engine.encode(self.tileMatrix), self.rng, FOUR_PROBABILITY)
+		self.tileMatrix = engine.decode(board)
+		return cell, exponent
 	def checkIfCanGo(self):
 		tm = self.tileMatrix
 		for i in range(0, self.board_size ** 2):
@@ -142,18 +188,9 @@ class Game:
 		return False
 	def reset(self):
 		self.total_points = 0
-		self.surface.fill(BLACK)
+		self.renderer.invalidate()
 		self.tileMatrix = [[0 for i in range(self.board_size)] for j in range(self.board_size)]
 		self.loop()
-	def canMove(self):
-		tm = self.tileMatrix
-		for i in range(0, self.board_size):
-			for j in range(1, self.board_size):
-				if tm[i][j-1] == 0 and tm[i][j] > 0:
-					return True
-				elif (tm[i][j-1] == tm[i][j]) and tm[i][j-1] != 0:
-					return True
-		return False
 	def saveGameState(self):
 		f = open("savedata", "w")
 		line1 = " ".join([str(self.tileMatrix[int(x / self.board_size)][x % self.board_size])
@@ -171,18 +208,6 @@ class Game:
 			self.tileMatrix[int(i / self.board_size)][i % self.board_size] = int(m[i])
 		f.close()
 		self.loop(True)
-	def rotateMatrixClockwise(self):
-		tm = self.tileMatrix
-		for i in range(0, int(self.board_size/2)):
-			for k in range(i, self.board_size- i - 1):
-				temp1 = tm[i][k]
-				temp2 = tm[self.board_size - 1 - k][i]
-				temp3 = tm[self.board_size - 1 - i][self.board_size - 1 - k]
-				temp4 = tm[k][self.board_size - 1 - i]
-				tm[self.board_size - 1 - k][i] = temp1
-				tm[self.board_size - 1 - i][self.board_size - 1 - k] = temp2
-				tm[k][self.board_size - 1 - i] = temp3
-				tm[i][k] = temp4
 	def isArrow(self, k):
 		return(k == pygame.K_UP or k == pygame.K_DOWN or k == pygame.K_LEFT or k == pygame.K_RIGHT)
 	def getRotations(self, k):
@@ -211,5 +236,11 @@ class Game:
 			self.printMatrix()
 
 if __name__ == '__main__':
-	game = Game()
+	parser = argparse.ArgumentParser(description="2048 with an expectimax AI")
+	parser.add_argument('--telemetry', action='store_true', help="log every decision of the AI")
+	parser.add_argument('--seed', type=int, default=None, help="seed of the first game, the AI then searches to a fixed depth so the seed replays it")
+	parser.add_argument('--replay', help="append every game to this binary replay log")
+	args = parser.parse_args()
+	logging.basicConfig(level=logging.INFO if args.telemetry else logging.WARNING)
+	game = Game(args.seed, args.replay)
 	game.loop()
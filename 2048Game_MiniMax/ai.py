@@ -2,30 +2,51 @@
 # ZHAOKAI XU
 
 from __future__ import absolute_import, division, print_function
-import copy
 import random
 import heapq
-MOVES = {0: 'up', 1: 'left', 2: 'down', 3: 'right'}
+from arena import NodeArena
+# the search itself lives in expectimax.py, its names are kept importable from here
+from expectimax import (MOVES, FOUR_PROBABILITY, Budget, Decision, Expectimax, MatrixEngine,
+	SearchCancelled, SearchTimeout, Simulator, decide, searchPool)
 PLAYERS = {'player': 0, 'computer': 1}
 
 
 class Node:	
-	"""Node of the GameTree"""
-	def __init__(self, matrix, player, score):
+	"""Node of the GameTree
+
+	Nodes made by treeGenerator() hold an immutable engine board (a packed
+	int or tuples) instead of a matrix, so children share it with no copy.
+	Slots instead of a __dict__ keep every node small; arena.NodeArena stores
+	a whole tree in flat arrays instead.
+	"""
+	__slots__ = ('matrix', 'board', 'engine', 'player', 'score', 'children', 'move', 'isTerminal',
+		'probability')
+
+	def __init__(self, matrix, player, score, board=None, engine=None):
 		self.matrix = matrix
+		self.board = board
+		self.engine = engine
 		self.player =player
 		self.score = score
-		self.children =  []
+		self.children =  ()		# a list from the first addchildren() on
 		self.move =  -1
 		self.isTerminal = False
+		self.probability = 1.0		# chance of this node given its parent
 
 	def setMovement(self, move):
 		self.move = move
 	def setisTerminal(self):
 		self.isTerminal = True
+	def setProbability(self, probability):
+		self.probability = probability
 
 	def getMatrix(self):
+		'''the board as a list-of-lists, decoded afresh for engine nodes'''
+		if self.matrix is None:
+			return self.engine.decode(self.board)
 		return self.matrix		
+	def getBoard(self):
+		return self.board
 	def getPlayer(self):
 	    return self.player
 	def getScore(self):
@@ -34,62 +55,61 @@ class Node:
 		return self.move 
 	def getisTerminal(self):
 		return self.isTerminal
+	def getProbability(self):
+		return self.probability
 	def payoff(self):
 		return self.score
 
 	def addchildren(self,newnode):
-		self.children.append(newnode)
+		if self.children:
+			self.children.append(newnode)
+		else:
+			self.children = [newnode]
 	def getChildren(self):
 		return self.children
-	def chance(self):
-		return 1.0/len(self.children)
 
 
-class Gametree:
-	"""main class for the AI"""
 
-	def __init__(self, root_state, depth_of_tree, current_score): 
-		'''construct a game tree from any Node of the game'''
+class Gametree(Expectimax):
+	"""main class for the AI: the expectimax search of one position, plus its explicit game tree"""
 
-		self.root = Node(root_state, PLAYERS['player'], current_score)
-		self.depth_of_tree = depth_of_tree
+	def __init__(self, root_state, depth_of_tree, current_score, simulator=None, cache=None, epsilon=0.0,
+			pool=None, splitChance=False, evaluator=None, batched=False, fourProbability=FOUR_PROBABILITY,
+			canonicalize=False, listener=None, margin=None, traceMemory=False): 
+		'''construct a game tree from any Node of the game, root_state is never modified'''
+		Expectimax.__init__(self, len(root_state), depth_of_tree, simulator, cache, epsilon, pool,
+			splitChance, evaluator, batched, fourProbability, canonicalize, listener, margin, traceMemory)
+		self.root = Node(root_state, PLAYERS['player'], current_score, self.engine.encode(root_state), self.engine)
+		self.rootBoard = self.root.getBoard()
+		self.rootScore = current_score
 
 	def treeGenerator(self,node,isTerminal):	
 		'''generate a level of the tree'''
 
+		board = node.getBoard()
 		if node.getPlayer() == PLAYERS['player']: 
 			# simulate the four possible moves
 			for i in range(4):
-				simulator = Simulator( copy.deepcopy(node.getMatrix()), node.getScore() )
+				newBoard, gained = self.engine.move(board, i)
 
-				if simulator.checkIfCanGo():
-					simulator.move(i)
-					
-					if( simulator.getMatrix() != copy.deepcopy(node.getMatrix()) ):
-						
-						# create a child Node obj from the simulator   	
-						child = Node(copy.deepcopy(simulator.getMatrix()), PLAYERS['computer'], simulator.getScore())
+				if newBoard != board:
+					# create a child Node obj sharing the immutable board
+					child = Node(None, PLAYERS['computer'], node.getScore() + gained, newBoard, self.engine)
 
-						child.setMovement(i)
+					child.setMovement(i)
 
-						if isTerminal:
-							child.setisTerminal()
+					if isTerminal:
+						child.setisTerminal()
 
-						node.addchildren(child)
+					node.addchildren(child)
 
 		elif node.getPlayer() == PLAYERS['computer']:
-                 
-			currMatrix = copy.deepcopy(node.getMatrix())
 
-			# create a possible set of 2 in each child node
-			for i in range(len(currMatrix)):
-				for j in range(len(currMatrix)):
-					if currMatrix[i][j] == 0:
-						newMatrix = copy.deepcopy(currMatrix)
-						newMatrix[i][j] = 2
-						
-						child = Node(newMatrix, PLAYERS['player'], node.getScore())
-						node.addchildren(child)
+			# create a child for every 2 or 4 the computer may place
+			for newBoard, probability in self.engine.spawns(board, self.fourProbability):
+				child = Node(None, PLAYERS['player'], node.getScore(), newBoard, self.engine)
+				child.setProbability(probability)
+				node.addchildren(child)
 
 
 	def growTree(self, node):
@@ -119,127 +139,95 @@ class Gametree:
 		    for child in node.getChildren():
 		       value = max( value, self.expectimax(child) )
 		    return value
-		# if is computer, set the chance of appearing the next 2 to be equal in all empty tile 
+		# if is computer, weigh every placed tile by its probability
 		elif node.getPlayer() == PLAYERS['computer']:
 			value = 0
 			for child in node.getChildren():
-				value = value + self.expectimax(child) * node.chance()
+				value = value + self.expectimax(child) * child.getProbability()
 			return value
 		else:
 			return 'Error'
 
 
-	def compute_decision(self):
-		'''function to return best decision to game'''
-
-		# 1	grow the tree
-		self.growTree(self.root) 
-		
-		# 2	find the path to generate the max value from its subtree
-		maxValue = 0
-		optimal_move = 0
-
-		if len(self.root.getChildren()) is 0:
+	def growArena(self, depth=3):
+		'''the tree of growTree(), to any depth, as an arena.NodeArena'''
+		root = self.root
+		arena = NodeArena(isinstance(root.getBoard(), int))
+		arena.add(root.getBoard(), root.getPlayer(), root.getScore())
+		level = [0]
+		for ply in range(depth):
+			nextLevel = []
+			for node in level:
+				board = arena.board[node]
+				score = arena.score[node]
+				first = len(arena)
+				if arena.player[node] == PLAYERS['player']:
+					for direction in range(4):
+						child, gained = self.engine.move(board, direction)
+						if child != board:
+							arena.add(child, PLAYERS['computer'], score + gained, direction)
+				else:
+					for child, probability in self.engine.spawns(board, self.fourProbability):
+						arena.add(child, PLAYERS['player'], score, -1, probability)
+				arena.setChildren(node, first, len(arena) - first)
+				nextLevel.extend(range(first, len(arena)))
+			level = nextLevel
+		return arena
+
+	def arenaValues(self, arena):
+		'''expectimax value of every node of an arena, a list indexed by node id
+
+		children come after their parents, so one backward pass sees every
+		child before its parent; childless nodes are worth their score
+		'''
+		values = [0.0] * len(arena)
+		score, first, count = arena.score, arena.first, arena.count
+		player, probability = arena.player, arena.probability
+		for node in range(len(arena) - 1, -1, -1):
+			n = count[node]
+			if n == 0:
+				values[node] = score[node]
+			elif player[node] == PLAYERS['player']:
+				values[node] = max(values[first[node]:first[node] + n])
+			else:
+				start = first[node]
+				values[node] = sum(values[child] * probability[child] for child in range(start, start + n))
+		return values
+
+	def compute_arena_decision(self, depth=3):
+		'''best decision from an explicit tree grown into a NodeArena'''
+		arena = self.growArena(depth)
+		values = self.arenaValues(arena)
+		children = arena.children(0)
+		if len(children) == 0:
+			return -1
+		best = max(children, key=lambda child: (values[child], -arena.move[child]))
+		print ("next move:", MOVES[arena.move[best]])
+		print ("score", values[best] )
+		return arena.move[best]
+
+	def compute_decision(self, timeLimit=None):
+		'''function to return best decision to game
+
+		searches the root with decide(), to depth_of_tree plies or, with a
+		timeLimit in seconds, as deep as the time allows
+		'''
+		decision = self.decide(self.root.getMatrix(), self.root.getScore(),
+			Budget(self.depth_of_tree, timeLimit))
+		if decision.move == -1:
 			return -1
 
-		for child in self.root.getChildren():
-
-			child_value = self.expectimax(child)
-		
-			if child_value > maxValue:
-				maxValue = child_value
-				optimal_move = child.getMovement()
-	
-		print ("next move:", MOVES[optimal_move])
-		print ("score", maxValue )
-
-		return optimal_move
+		print ("next move:", MOVES[decision.move])
+		print ("score", decision.value, "depth", decision.depth )
+		if self.cache is not None:
+			print ("cache hit rate %.3f, evictions %d" % (self.cache.hitRate(), self.cache.evictions))
 
+		return decision.move
 
-class Simulator:
-	"""Simulation of the game"""
+	def compute_tree_decision(self):
+		'''best decision from the explicit depth-3 tree, grown into a NodeArena
 
-	def __init__(self, matrix, score):
-		self.matrix = matrix
-		self.score = score
-
-	def getMatrix(self):
-            return self.matrix
-	
-	def getScore(self):
-            return self.score
-
-	def move(self, direction):
-		for i in range(0, direction):
-			self.rotateMatrixClockwise()
-		if self.canMove():
-			self.moveTiles()
-			self.mergeTiles()
-		for j in range(0, (4 - direction) % 4):
-			self.rotateMatrixClockwise()
-
-	def moveTiles(self):
-		# store the matrix before moving 
-		tm = self.matrix
-		size_board = len(self.matrix)
-
-		for i in range(0, size_board):      
-			for j in range(0, size_board - 1): 
-				while tm[i][j] == 0 and sum(tm[i][j:]) > 0:
-					for k in range(j, size_board - 1): 
-						tm[i][k] = tm[i][k + 1]
-					tm[i][size_board - 1] = 0  
-
-	def mergeTiles(self): 
-		tm = self.matrix
-		size_board = len(self.matrix)
-
-		for i in range(0, size_board):
-			for k in range(0, size_board - 1):
-				if tm[i][k] == tm[i][k + 1] and tm[i][k] != 0:
-					tm[i][k] = tm[i][k] * 2
-					tm[i][k + 1] = 0
-					self.score += tm[i][k]
-					self.moveTiles()
-
-	def checkIfCanGo(self):
-		tm = self.matrix
-		size_board = len(self.matrix)
-
-		for i in range(0, size_board ** 2): 
-			if tm[int(i / size_board)][i % size_board] == 0: 
-				return True		
-		for i in range(0, size_board):      
-			for j in range(0, size_board - 1):  
-				if tm[i][j] == tm[i][j + 1]:
-					return True
-				elif tm[j][i] == tm[j + 1][i]:
-					return True
-		return False
-
-	def canMove(self): 
-		tm = self.matrix
-		size_board = len(self.matrix)
-
-		for i in range(0, size_board):
-			for j in range(1, size_board):
-				if tm[i][j-1] == 0 and tm[i][j] > 0:
-					return True
-				elif (tm[i][j-1] == tm[i][j]) and tm[i][j-1] != 0:
-					return True
-		return False
-
-	def rotateMatrixClockwise(self):	
-		tm = self.matrix
-		size_board = len(self.matrix)
-
-		for i in range(0, int(size_board/2)): 
-			for k in range(i, size_board- i - 1): 
-				temp1 = tm[i][k]
-				temp2 = tm[size_board - 1 - k][i] 
-				temp3 = tm[size_board - 1 - i][size_board - 1 - k] 
-				temp4 = tm[k][size_board - 1 - i] 
-				tm[size_board - 1 - k][i] = temp1 
-				tm[size_board - 1 - i][size_board - 1 - k] = temp2 
-				tm[k][size_board - 1 - i] = temp3  
-				tm[i][k] = temp4	
+		the arena holds the nodes growTree() would make in flat arrays, at a
+		fraction of the memory of Node objects (benchmark.py allocation)
+		'''
+		return self.compute_arena_decision(3)
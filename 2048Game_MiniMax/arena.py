@@ -0,0 +1,56 @@
+# Struct-of-arrays game tree for the 2048 AI
+#
+# For callers that need the explicit tree rather than the depth-first search,
+# NodeArena keeps every node as an integer id into parallel arrays instead of
+# one Python object per node. Nodes are added level by level, so the children
+# of a node are the contiguous ids first[n] ... first[n] + count[n] - 1 and
+# always come after their parent.
+
+from __future__ import absolute_import, division, print_function
+from array import array
+
+
+class NodeArena:
+	"""Explicit game tree stored in parallel arrays indexed by node id
+
+	packed boards (ints of up to 64 bits) go in an unsigned 64-bit array,
+	other boards in a list; a node costs about 34 bytes plus its board
+	"""
+
+	def __init__(self, packed=True):
+		self.board = array('Q') if packed else []
+		self.score = array('q')
+		self.probability = array('d')	# chance of the node given its parent
+		self.move = array('b')		# move leading to the node, -1 for spawns and the root
+		self.player = array('b')
+		self.first = array('i')		# id of the first child
+		self.count = array('H')		# number of children, 0 for leaves
+
+	def __len__(self):
+		return len(self.score)
+
+	def add(self, board, player, score, move=-1, probability=1.0):
+		'''append a childless node, return its id'''
+		self.board.append(board)
+		self.score.append(score)
+		self.probability.append(probability)
+		self.move.append(move)
+		self.player.append(player)
+		self.first.append(0)
+		self.count.append(0)
+		return len(self.score) - 1
+
+	def setChildren(self, node, first, count):
+		self.first[node] = first
+		self.count[node] = count
+
+	def children(self, node):
+		'''ids of the children of node'''
+		first = self.first[node]
+		return range(first, first + self.count[node])
+
+	def nbytes(self):
+		'''bytes held by the arrays, boards stored in a list not included'''
+		return sum(column.itemsize * len(column) for column in
+			(self.score, self.probability, self.move, self.player, self.first, self.count) +
+			((self.board,) if isinstance(self.board, array) else ()))
@@ -0,0 +1,146 @@
+# Batched 2048 simulation with NumPy
+#
+# BatchSimulator applies one move to a whole (N, 4, 4) array of boards with
+# the row tables of bitboard.py, and lists every "place a tile" child of them.
+# The same operations on arrays of packed boards let plyRootValues() run the
+# expectimax one ply at a time: each ply is a handful of array operations
+# instead of one Python call per node.
+
+from __future__ import absolute_import, division, print_function
+import numpy as np
+
+import bitboard
+from bitboard import SIZE
+from heuristics import transposeBatch
+
+ROW_LEFT = np.array(bitboard.ROW_LEFT, dtype=np.uint64)
+ROW_RIGHT = np.array(bitboard.ROW_RIGHT, dtype=np.uint64)
+SCORE_LEFT = np.array(bitboard.SCORE_LEFT, dtype=np.int64)
+SCORE_RIGHT = np.array(bitboard.SCORE_RIGHT, dtype=np.int64)
+MASK = np.uint64(bitboard.ROW_MASK)
+SHIFTS = [np.uint64(16 * i) for i in range(SIZE)]
+NIBBLES = np.arange(SIZE * SIZE, dtype=np.uint64) * np.uint64(4)
+
+
+def pack(matrices):
+	'''(N, 4, 4) tile values to an (N,) array of packed boards'''
+	matrices = np.asarray(matrices)
+	exponents = np.zeros(matrices.shape, dtype=np.uint64)
+	nonzero = matrices > 0
+	exponents[nonzero] = np.log2(matrices[nonzero]).round().astype(np.uint64)
+	return (exponents.reshape(len(matrices), SIZE * SIZE) << NIBBLES).sum(axis=1, dtype=np.uint64)
+
+
+def unpack(boards):
+	'''(N,) packed boards to (N, 4, 4) tile values'''
+	boards = np.asarray(boards, dtype=np.uint64)
+	exponents = (boards[:, None] >> NIBBLES) & np.uint64(0xF)
+	tiles = np.where(exponents > 0, np.left_shift(1, exponents.astype(np.int64)), 0)
+	return tiles.reshape(len(boards), SIZE, SIZE)
+
+
+def _applyRows(boards, table, scores):
+	moved = np.zeros(boards.shape, dtype=np.uint64)
+	gained = np.zeros(boards.shape, dtype=np.int64)
+	for shift in SHIFTS:
+		rows = ((boards >> shift) & MASK).astype(np.intp)
+		moved |= table[rows] << shift
+		gained += scores[rows]
+	return moved, gained
+
+
+def moveBatch(boards, direction):
+	'''bitboard.move() over an array of packed boards: (boards, gained, changed)'''
+	boards = np.asarray(boards, dtype=np.uint64)
+	if direction == 0:
+		moved, gained = _applyRows(boards, ROW_LEFT, SCORE_LEFT)
+	elif direction == 2:
+		moved, gained = _applyRows(boards, ROW_RIGHT, SCORE_RIGHT)
+	else:
+		table, scores = (ROW_LEFT, SCORE_LEFT) if direction == 1 else (ROW_RIGHT, SCORE_RIGHT)
+		moved, gained = _applyRows(transposeBatch(boards), table, scores)
+		moved = transposeBatch(moved)
+	return moved, gained, moved != boards
+
+
+def spawnBatch(boards, fourProbability=0.0):
+	'''every board reachable by placing a tile in an empty cell
+
+	returns (children, parent index, probability given the parent); children
+	get a 2 and, when fourProbability is not 0, also a 4
+	'''
+	boards = np.asarray(boards, dtype=np.uint64)
+	empty = ((boards[:, None] >> NIBBLES) & np.uint64(0xF)) == 0
+	parents, cells = np.nonzero(empty)
+	counts = empty.sum(axis=1)[parents]
+	children = boards[parents] | (np.uint64(1) << NIBBLES[cells])
+	probabilities = (1.0 - fourProbability) / counts
+	if fourProbability:
+		fours = boards[parents] | (np.uint64(2) << NIBBLES[cells])
+		children = np.concatenate([children, fours])
+		probabilities = np.concatenate([probabilities, fourProbability / counts])
+		parents = np.concatenate([parents, parents])
+	return children, parents, probabilities
+
+
+class BatchSimulator:
+	"""Simulator over an (N, 4, 4) array of boards"""
+
+	def move(self, boards, direction):
+		'''apply one move to every board: (boards, scores gained, changed mask)'''
+		moved, gained, changed = moveBatch(pack(boards), direction)
+		return unpack(moved), gained, changed
+
+	def spawnAll(self, boards, fourProbability=0.0):
+		'''every "place a tile" child of every board
+
+		returns ((M, 4, 4) children, (M,) parent index, (M,) probability given the parent)
+		'''
+		children, parents, probabilities = spawnBatch(pack(boards), fourProbability)
+		return unpack(children), parents, probabilities
+
+
+def plyRootValues(board, depth, score=0, evaluator=None, fourProbability=0.0, check=None):
+	'''Gametree.rootValues() for a packed board, expanding whole plies as arrays
+
+	the tree is expanded breadth-first to depth plies and then backed up
+	with array reductions, so memory grows with the width of the last ply.
+	check, if given, is called before every ply of spawns is expanded and
+	may raise to give the search up, e.g. at a deadline
+	'''
+	lost = getattr(evaluator, 'lost', 0)
+
+	def leafValues(boards):
+		if evaluator is None or len(boards) == 0:
+			return np.zeros(len(boards))
+		return np.asarray(evaluator.evaluateBatch(boards), dtype=np.float64)
+
+	def playerValues(boards, depth):
+		# (4, N) values of every move, -inf where the move is illegal
+		values = np.full((4, len(boards)), -np.inf)
+		for direction in range(4):
+			moved, gained, changed = moveBatch(boards, direction)
+			values[direction, changed] = gained[changed] + chanceValues(moved[changed], depth - 1)
+		return values
+
+	def chanceValues(boards, depth):
+		if depth == 0 or len(boards) == 0:
+			return leafValues(boards)
+		if check is not None:
+			check()
+		children, parents, probabilities = spawnBatch(boards, fourProbability)
+		childValues = maxValues(children, depth - 1)
+		return np.bincount(parents, weights=probabilities * childValues, minlength=len(boards))
+
+	def maxValues(boards, depth):
+		if depth == 0 or len(boards) == 0:
+			return leafValues(boards)
+		best = playerValues(boards, depth).max(axis=0)
+		over = np.isneginf(best)
+		if over.any():
+			best[over] = leafValues(boards[over]) - lost
+		return best
+
+	values = playerValues(np.array([board], dtype=np.uint64), depth)[:, 0]
+	return dict((direction, score + float(values[direction]))
+		for direction in range(4) if not np.isneginf(values[direction]))
@@ -0,0 +1,316 @@
+# Benchmarks for the 2048 AI
+#
+# usage: python3 benchmark.py [name ...]
+# with no names every benchmark is run
+
+from __future__ import absolute_import, division, print_function
+import contextlib
+import copy
+import gc
+import io
+import os
+import random
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import baseline
+import bitboard
+import symmetry
+import test as legacy
+from ai import Gametree
+from heuristics import Evaluator
+from ttable import TranspositionTable
+from bitboard import BitboardSimulator
+
+
+def randomBoards(count, seed=2048, minMoves=20, maxMoves=200, minEmpty=0):
+	'''boards sampled from random games, returned as matrices'''
+	rng = random.Random(seed)
+	boards = []
+	while len(boards) < count:
+		board = 0
+		for _ in range(2):
+			cells = bitboard.emptyCells(board)
+			board |= 1 << (4 * rng.choice(cells))
+		for _ in range(rng.randint(minMoves, maxMoves)):
+			moves = [m for m in (bitboard.move(board, d)[0] for d in range(4)) if m != board]
+			if not moves:
+				break
+			board = rng.choice(moves)
+			board |= 1 << (4 * rng.choice(bitboard.emptyCells(board)))
+		if bitboard.canGo(board) and bitboard.countEmpty(board) >= minEmpty:
+			boards.append(bitboard.decode(board))
+	return boards
+
+
+def countNodes(node):
+	total = 1
+	for child in node.getChildren():
+		total += countNodes(child)
+	return total
+
+
+def timeMoves(boards, simulator, repeat):
+	moves = 0
+	start = time.perf_counter()
+	for _ in range(repeat):
+		for matrix in boards:
+			for direction in range(4):
+				simulator(copy.deepcopy(matrix), 0).move(direction)
+				moves += 1
+	return moves / (time.perf_counter() - start)
+
+
+def timePackedMoves(boards, repeat):
+	packed = [bitboard.encode(matrix) for matrix in boards]
+	move = bitboard.move
+	moves = 0
+	start = time.perf_counter()
+	for _ in range(repeat):
+		for board in packed:
+			for direction in range(4):
+				move(board, direction)
+				moves += 1
+	return moves / (time.perf_counter() - start)
+
+
+def timeTree(boards, tree):
+	'''nodes per second of growing the depth-3 trees of tree(matrix)'''
+	nodes = 0
+	start = time.perf_counter()
+	for matrix in boards:
+		grown = tree(copy.deepcopy(matrix))
+		grown.growTree(grown.root)
+		nodes += countNodes(grown.root)
+	return nodes / (time.perf_counter() - start)
+
+
+def benchBitboard():
+	'''moves and tree nodes per second, the original list Simulator and tree vs packed board'''
+	boards = randomBoards(200)
+	listMoves = timeMoves(boards, baseline.Simulator, 5)
+	packedMoves = timePackedMoves(boards, 50)
+	print("moves/s  Simulator %10.0f  bitboard.move %10.0f  speedup %.1fx"
+		% (listMoves, packedMoves, packedMoves / listMoves))
+	listNodes = timeTree(boards[:20], lambda matrix: baseline.Gametree(matrix, 3, 0))
+	packedNodes = timeTree(boards[:20], lambda matrix: Gametree(matrix, 3, 0, BitboardSimulator))
+	print("nodes/s  original tree %6.0f  BitboardSimulator %6.0f  speedup %.1fx"
+		% (listNodes, packedNodes, packedNodes / listNodes))
+
+
+def decide(matrix, depth, **options):
+	'''(move, seconds) of one quiet compute_decision call'''
+	tree = Gametree(copy.deepcopy(matrix), depth, 0, **options)
+	start = time.perf_counter()
+	with contextlib.redirect_stdout(io.StringIO()):
+		move = tree.compute_decision()
+	return move, time.perf_counter() - start
+
+
+def quietMove(function):
+	'''(move, seconds) of a decision function, with its output discarded'''
+	start = time.perf_counter()
+	with contextlib.redirect_stdout(io.StringIO()):
+		move = function()
+	return move, time.perf_counter() - start
+
+
+def benchCore():
+	'''regression of the expectimax.decide() core against the explicit depth-3 trees it replaced'''
+	boards = randomBoards(100)
+	print("                      agree   tree ms/move  decide ms/move")
+	for label, tree in (('test.py', lambda matrix: legacy.Gametree(copy.deepcopy(matrix), 3, 0)),
+			('ai.py', lambda matrix: Gametree(copy.deepcopy(matrix), 3, 0))):
+		agree = 0
+		treeTime = 0
+		coreTime = 0
+		for matrix in boards:
+			expected, seconds = quietMove(tree(matrix).compute_tree_decision)
+			treeTime += seconds
+			move, seconds = quietMove(tree(matrix).compute_decision)
+			coreTime += seconds
+			agree += move == expected
+		print("%-20s %6.1f%% %14.2f %15.2f" % (label, 100.0 * agree / len(boards),
+			1000 * treeTime / len(boards), 1000 * coreTime / len(boards)))
+
+
+def benchPruning(depth=7):
+	'''decision quality and latency of chance-node pruning against the exhaustive search'''
+	# pruning matters on open boards, where chance nodes have many children
+	boards = randomBoards(20, minEmpty=6)
+	reference = []
+	exhaustiveTime = 0
+	for matrix in boards:
+		values = Gametree(copy.deepcopy(matrix), depth, 0).rootValues()
+		move, seconds = decide(matrix, depth)
+		reference.append((values, move))
+		exhaustiveTime += seconds
+	print("epsilon   agree   regret  ms/move  speedup")
+	print("%-8s %6.1f%% %8.2f %8.2f %7.1fx" % (0, 100.0, 0.0, 1000 * exhaustiveTime / len(boards), 1.0))
+	for epsilon in (0.001, 0.005, 0.01, 0.02):
+		agree = 0
+		regret = 0
+		elapsed = 0
+		for matrix, (values, best) in zip(boards, reference):
+			move, seconds = decide(matrix, depth, epsilon=epsilon)
+			agree += move == best
+			regret += values[best] - values[move]
+			elapsed += seconds
+		print("%-8s %6.1f%% %8.2f %8.2f %7.1fx" % (epsilon, 100.0 * agree / len(boards),
+			regret / len(boards), 1000 * elapsed / len(boards), exhaustiveTime / elapsed))
+
+
+def benchParallel(depth=7):
+	'''ms per decision searching the root moves serially and on a process pool'''
+	boards = randomBoards(10, minEmpty=6)
+	elapsed = 0
+	cache = TranspositionTable(200000)
+	for matrix in boards:
+		elapsed += decide(matrix, depth, cache=cache)[1]
+	print("%-16s %8.2f ms/move" % ('serial', 1000 * elapsed / len(boards)))
+	for label, splitChance in (('root-parallel', False), ('chance-parallel', True)):
+		# a fresh pool per mode so worker caches do not carry over
+		pool = ProcessPoolExecutor()
+		decide(randomBoards(1, seed=1)[0], 1, pool=pool)
+		elapsed = 0
+		for matrix in boards:
+			elapsed += decide(matrix, depth, pool=pool, splitChance=splitChance)[1]
+		pool.shutdown()
+		print("%-16s %8.2f ms/move" % (label, 1000 * elapsed / len(boards)))
+	print("%d cpus" % (os.cpu_count() or 1))
+
+
+def benchBatch(depth=5):
+	'''ms per decision of the depth-first search and of the ply-wise NumPy search'''
+	boards = randomBoards(20, minEmpty=5)
+	evaluator = Evaluator()
+	for label, options in (('depth-first', {}), ('ply batches', {'batched': True})):
+		elapsed = sum(decide(matrix, depth, evaluator=evaluator, **options)[1] for matrix in boards)
+		print("%-12s %8.2f ms/move" % (label, 1000 * elapsed / len(boards)))
+
+
+def benchAllocation():
+	'''bytes traced by tracemalloc per node, and garbage collections, while depth-3 trees are grown'''
+	boards = randomBoards(20, minEmpty=4)
+	def growNodes(tree):
+		tree.growTree(tree.root)
+		return tree.root, countNodes(tree.root)
+
+	def growArena(tree):
+		arena = tree.growArena(3)
+		return arena, len(arena)
+
+	# the original deep-copying tree, ai.Node trees and the NodeArena of compute_tree_decision()
+	builds = [('original tree', lambda matrix: baseline.Gametree(copy.deepcopy(matrix), 3, 0), growNodes),
+		('Node tree', lambda matrix: Gametree(matrix, 3, 0, BitboardSimulator), growNodes),
+		('NodeArena', lambda matrix: Gametree(matrix, 3, 0, BitboardSimulator), growArena)]
+	for label, makeTree, grow in builds:
+		nodes = 0
+		retained = 0
+		peak = 0
+		trees = []
+		collections = sum(generation['collections'] for generation in gc.get_stats())
+		tracemalloc.start()
+		for matrix in boards:
+			tree = makeTree(matrix)
+			tracemalloc.reset_peak()
+			before = tracemalloc.get_traced_memory()[0]
+			built, count = grow(tree)
+			current, highest = tracemalloc.get_traced_memory()
+			nodes += count
+			retained += current - before
+			peak += highest - before
+			trees.append(built)
+		tracemalloc.stop()
+		collections = sum(generation['collections'] for generation in gc.get_stats()) - collections
+		print("%-18s %8d nodes %8.1f bytes/node retained %8.1f bytes/node peak %4d gc runs"
+			% (label, nodes, retained / nodes, peak / nodes, collections))
+
+
+def benchSymmetry(depth=5):
+	'''cost of canonical cache keys against the cache hits they add'''
+	boards = randomBoards(200)
+	packed = [bitboard.encode(matrix) for matrix in boards] * 50
+	for label, function in (('bitboard.move', lambda board: bitboard.move(board, 1)),
+			('canonicalKey', symmetry.canonicalKey)):
+		start = time.perf_counter()
+		for board in packed:
+			function(board)
+		print("%-14s %8.0f ns/board" % (label, 1e9 * (time.perf_counter() - start) / len(packed)))
+	# corner weights break the symmetry, the other heuristics keep it
+	evaluator = Evaluator(corner=0)
+	# sparse opening boards have many symmetric subtrees, crowded ones few
+	for stage, minMoves, maxMoves in (('opening', 0, 5), ('midgame', 20, 200)):
+		boards = randomBoards(20, minMoves=minMoves, maxMoves=maxMoves)
+		for canonicalize in (False, True):
+			cache = TranspositionTable()
+			elapsed = sum(decide(matrix, depth, cache=cache, evaluator=evaluator,
+				canonicalize=canonicalize)[1] for matrix in boards)
+			print("%-8s canonicalize=%-5s %8.2f ms/move  hit rate %.3f  %5d entries"
+				% (stage, canonicalize, 1000 * elapsed / len(boards), cache.hitRate(), len(cache)))
+
+
+def benchRender(count=500):
+	'''ms per frame redrawing the whole board every move and with BoardRenderer'''
+	os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+	import pygame
+	from renderer import BoardRenderer
+	pygame.init()
+	surface = pygame.Surface((400, 500))
+	tileFont = pygame.font.SysFont("arial", 40)
+	scoreFont = pygame.font.SysFont("arial", 30)
+	colors = dict((1 << k, (k * 15, 100, 255 - k * 15)) for k in range(1, 16))
+	colors[0] = (0, 0, 0)
+	# consecutive positions and scores of random games, as the window shows them
+	rng = random.Random(2048)
+	board = bitboard.place(0, 0, 1)
+	score = 0
+	frames = []
+	while len(frames) < count:
+		frames.append((bitboard.decode(board), score))
+		moves = [bitboard.move(board, d) for d in range(4)]
+		moves = [(moved, gained) for moved, gained in moves if moved != board]
+		if not moves:
+			board, score = bitboard.place(0, 0, 1), 0
+			continue
+		board, gained = rng.choice(moves)
+		score += gained
+		board = bitboard.place(board, rng.choice(bitboard.emptyCells(board)), 1)
+
+	def fullRedraw(matrix, score):
+		# what printMatrix() did before BoardRenderer: everything, score once per tile
+		surface.fill((0, 0, 0))
+		for i in range(4):
+			for j in range(4):
+				pygame.draw.rect(surface, colors[matrix[i][j]], (i * 100, j * 100 + 100, 100, 100))
+				label = tileFont.render(str(matrix[i][j]), 1, (255, 255, 255))
+				label2 = scoreFont.render("Score:" + str(score), 1, (255, 255, 255))
+				surface.blit(label, (i * 100 + 30, j * 100 + 130))
+				surface.blit(label2, (10, 20))
+
+	renderer = BoardRenderer(surface, tileFont, scoreFont, colors)
+	for label, draw in (('full redraw', fullRedraw), ('BoardRenderer', renderer.draw)):
+		start = time.perf_counter()
+		for matrix, score in frames:
+			draw(matrix, score)
+		print("%-14s %8.3f ms/frame" % (label, 1000 * (time.perf_counter() - start) / len(frames)))
+	pygame.quit()
+
+
+BENCHMARKS = {
+	'allocation': benchAllocation,
+	'batch': benchBatch,
+	'bitboard': benchBitboard,
+	'core': benchCore,
+	'parallel': benchParallel,
+	'pruning': benchPruning,
+	'render': benchRender,
+	'symmetry': benchSymmetry,
+}
+
+if __name__ == '__main__':
+	for name in sys.argv[1:] or sorted(BENCHMARKS):
+		print("==", name)
+		BENCHMARKS[name]()
@@ -0,0 +1,194 @@
+# Packed 64-bit board for the 2048 AI
+#
+# The 4x4 board is stored in a single int, 4 bits per tile holding the
+# exponent of the tile (0 for an empty cell, 1 for 2, 2 for 4, ...).
+# Cell (i, j) of the game matrix lives in nibble 4 * i + j, so every matrix
+# row is one 16-bit chunk with column 0 in its lowest nibble.
+#
+# Moving a row is a lookup in tables precomputed for all 65536 rows, and
+# column moves reuse the same tables on the transposed board.
+
+from __future__ import absolute_import, division, print_function
+
+SIZE = 4
+ROW_MASK = 0xFFFF
+MAX_EXPONENT = 15	# a nibble holds tiles up to 32768, those never merge
+
+# direction numbers follow MOVES in ai.py: 0 up, 1 left, 2 down, 3 right
+# in matrix terms 0/2 shift each row towards column 0/3 and
+# 1/3 shift each column towards row 0/3
+
+
+def moveRowLeft(row):
+	'''slide and merge one unpacked row of exponents towards index 0, return (row, gained)'''
+	tiles = [t for t in row if t != 0]
+	result = []
+	gained = 0
+	k = 0
+	while k < len(tiles):
+		if k + 1 < len(tiles) and tiles[k] == tiles[k + 1] and tiles[k] < MAX_EXPONENT:
+			result.append(tiles[k] + 1)
+			gained += 1 << (tiles[k] + 1)
+			k += 2
+		else:
+			result.append(tiles[k])
+			k += 1
+	return result + [0] * (len(row) - len(result)), gained
+
+
+def _packRow(row):
+	return row[0] | (row[1] << 4) | (row[2] << 8) | (row[3] << 12)
+
+
+def _unpackRow(value):
+	return [(value >> (4 * j)) & 0xF for j in range(SIZE)]
+
+
+def _reverseRow(value):
+	return ((value & 0xF) << 12) | ((value & 0xF0) << 4) | ((value >> 4) & 0xF0) | (value >> 12)
+
+
+def _buildTables():
+	left = [0] * (ROW_MASK + 1)
+	right = [0] * (ROW_MASK + 1)
+	leftScore = [0] * (ROW_MASK + 1)
+	rightScore = [0] * (ROW_MASK + 1)
+	for value in range(ROW_MASK + 1):
+		moved, gained = moveRowLeft(_unpackRow(value))
+		left[value] = _packRow(moved)
+		leftScore[value] = gained
+	for value in range(ROW_MASK + 1):
+		reverse = _reverseRow(value)
+		right[value] = _reverseRow(left[reverse])
+		rightScore[value] = leftScore[reverse]
+	return left, right, leftScore, rightScore
+
+
+ROW_LEFT, ROW_RIGHT, SCORE_LEFT, SCORE_RIGHT = _buildTables()
+
+
+def encode(matrix):
+	'''pack a 4x4 list-of-lists of tile values into an int'''
+	board = 0
+	shift = 0
+	for row in matrix:
+		for tile in row:
+			if tile:
+				board |= (tile.bit_length() - 1) << shift
+			shift += 4
+	return board
+
+
+def decode(board):
+	'''unpack an int into a fresh 4x4 list-of-lists of tile values'''
+	matrix = []
+	for i in range(SIZE):
+		row = []
+		for j in range(SIZE):
+			exponent = (board >> (4 * (SIZE * i + j))) & 0xF
+			row.append(1 << exponent if exponent else 0)
+		matrix.append(row)
+	return matrix
+
+
+def transpose(board):
+	'''swap rows and columns of a packed board'''
+	a1 = board & 0xF0F00F0FF0F00F0F
+	a2 = board & 0x0000F0F00000F0F0
+	a3 = board & 0x0F0F00000F0F0000
+	a = a1 | (a2 << 12) | (a3 >> 12)
+	b1 = a & 0xFF00FF0000FF00FF
+	b2 = a & 0x00FF00FF00000000
+	b3 = a & 0x00000000FF00FF00
+	return b1 | (b2 >> 24) | (b3 << 24)
+
+
+def _applyRows(board, table, scores):
+	r0 = board & ROW_MASK
+	r1 = (board >> 16) & ROW_MASK
+	r2 = (board >> 32) & ROW_MASK
+	r3 = board >> 48
+	moved = table[r0] | (table[r1] << 16) | (table[r2] << 32) | (table[r3] << 48)
+	return moved, scores[r0] + scores[r1] + scores[r2] + scores[r3]
+
+
+def move(board, direction):
+	'''return (new board, points gained); the board is unchanged if the move is illegal'''
+	if direction == 0:
+		return _applyRows(board, ROW_LEFT, SCORE_LEFT)
+	if direction == 2:
+		return _applyRows(board, ROW_RIGHT, SCORE_RIGHT)
+	if direction == 1:
+		moved, gained = _applyRows(transpose(board), ROW_LEFT, SCORE_LEFT)
+	else:
+		moved, gained = _applyRows(transpose(board), ROW_RIGHT, SCORE_RIGHT)
+	return transpose(moved), gained
+
+
+def emptyCells(board):
+	'''nibble indices of the empty cells'''
+	return [k for k in range(SIZE * SIZE) if not (board >> (4 * k)) & 0xF]
+
+
+def spawns(board, fourProbability=0.0):
+	'''(board, probability) of every tile the computer may place in an empty cell'''
+	cells = emptyCells(board)
+	two = (1.0 - fourProbability) / len(cells)
+	children = [(board | (1 << (4 * k)), two) for k in cells]
+	if fourProbability:
+		four = fourProbability / len(cells)
+		children.extend((board | (2 << (4 * k)), four) for k in cells)
+	return children
+
+
+def place(board, cell, exponent):
+	'''put a tile of 2 ** exponent in an empty cell, a nibble index like emptyCells()'''
+	return board | (exponent << (4 * cell))
+
+
+def countEmpty(board):
+	board |= (board >> 2) & 0x3333333333333333
+	board |= board >> 1
+	return bin(~board & 0x1111111111111111).count('1')
+
+
+def canGo(board):
+	'''true if any move changes the board'''
+	for direction in range(4):
+		if move(board, direction)[0] != board:
+			return True
+	return False
+
+
+def maxTile(board):
+	exponent = 0
+	while board:
+		exponent = max(exponent, board & 0xF)
+		board >>= 4
+	return 1 << exponent if exponent else 0
+
+
+class BitboardSimulator:
+	"""Drop-in replacement of Simulator backed by a packed board"""
+
+	def __init__(self, matrix, score):
+		if len(matrix) != SIZE:
+			raise ValueError("BitboardSimulator only supports a %dx%d board" % (SIZE, SIZE))
+		self.board = encode(matrix)
+		self.score = score
+
+	def getMatrix(self):
+		return decode(self.board)
+
+	def getBoard(self):
+		return self.board
+
+	def getScore(self):
+		return self.score
+
+	def move(self, direction):
+		self.board, gained = move(self.board, direction)
+		self.score += gained
+
+	def checkIfCanGo(self):
+		return countEmpty(self.board) > 0 or canGo(self.board)
@@ -0,0 +1,666 @@
+# Expectimax core of the 2048 AI
+#
+# decide(board, score, budget) is the entry point every player of the game
+# searches through (ai.Gametree, test.py, the runner): it takes a tile matrix
+# and the score so far, searches as far as the budget allows and returns a
+# Decision. An Expectimax object keeps the search settings and state (cache,
+# process pool, evaluator, ...) and decides one position after another;
+# ai.Gametree adds the explicit game tree on top of it.
+
+from __future__ import absolute_import, division, print_function
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import bitboard
+import gridboard
+import symmetry
+import telemetry
+from bitboard import BitboardSimulator
+from ttable import TranspositionTable
+try:
+	import batch
+except ImportError:
+	# NumPy is only needed for the batched search
+	batch = None
+
+MOVES = {0: 'up', 1: 'left', 2: 'down', 3: 'right'}
+# the computer places a 4 instead of a 2 one time in ten, as in the game
+FOUR_PROBABILITY = 0.1
+
+
+class SearchTimeout(Exception):
+	"""Raised inside the search once the decision deadline has passed"""
+
+
+class SearchCancelled(Exception):
+	"""Raised out of decide() once the search's cancel token is set"""
+
+
+class Budget:
+	"""How far one decision may search: depth plies at most, and within
+	seconds by iterative deepening when seconds is not None"""
+
+	def __init__(self, depth=3, seconds=None):
+		self.depth = depth
+		self.seconds = seconds
+
+
+# move is -1 when no move is left; values maps every legal move to its value
+Decision = namedtuple('Decision', ['move', 'value', 'depth', 'values'])
+
+
+def decide(board, score=0, budget=3, **options):
+	'''best move for a tile matrix, see Expectimax.decide()
+
+	budget is a depth or a Budget, options are the settings of Expectimax
+	'''
+	return Expectimax(len(board), **options).decide(board, score, budget)
+
+
+# one warm pool shared by every search, see searchPool()
+_pool = None
+# per-process search state of pool workers, keyed on board size
+_workerTrees = {}
+
+
+def searchPool(workers=None):
+	'''process pool for parallel root evaluation, created once and kept warm across moves'''
+	global _pool
+	if _pool is None:
+		workers = workers or os.cpu_count() or 1
+		_pool = ProcessPoolExecutor(max_workers=workers)
+		# start every worker now, from the calling thread, rather than forking
+		# them on demand from whichever thread submits the first searches
+		for future in [_pool.submit(int) for i in range(workers)]:
+			future.result()
+	return _pool
+
+
+def _workerSearch(size, board, depth, epsilon, probability, seconds, isPlayer, evaluator=None,
+		fourProbability=FOUR_PROBABILITY, canonicalize=False):
+	'''run in a pool worker: value of one subtree given as a compact board encoding,
+	given up on after seconds, None for no limit'''
+	key = (size, evaluator, fourProbability, canonicalize)
+	tree = _workerTrees.get(key)
+	if tree is None:
+		# the cache lives as long as the worker, so it also serves later moves
+		tree = Expectimax(size, depth, cache=TranspositionTable(200000), evaluator=evaluator,
+			fourProbability=fourProbability, canonicalize=canonicalize)
+		_workerTrees[key] = tree
+	tree.epsilon = epsilon
+	# perf_counter() is not comparable across processes, so the deadline is
+	# rebuilt from the seconds the parent had left
+	tree.deadline = None if seconds is None else time.perf_counter() + seconds
+	try:
+		if isPlayer:
+			return tree.search(board, depth, probability)
+		return tree.chance(board, depth, probability)
+	finally:
+		tree.deadline = None
+
+
+class Expectimax:
+	"""Depth-first expectimax search over engine boards"""
+
+	def __init__(self, size=bitboard.SIZE, depth_of_tree=3, simulator=None, cache=None, epsilon=0.0,
+			pool=None, splitChance=False, evaluator=None, batched=False, fourProbability=FOUR_PROBABILITY,
+			canonicalize=False, listener=None, margin=None, traceMemory=False):
+		'''search settings for size x size boards, kept from one decision to the next'''
+		self.size = size
+		# deepest search of a decision, set from the budget by decide()
+		self.depth_of_tree = depth_of_tree
+		# board representation of the tree and the search: by default the most
+		# compact one for the board size (gridboard.engineFor), otherwise tuples
+		# moved by the given class with the Simulator interface
+		self.simulator = simulator
+		if simulator is None:
+			self.engine = gridboard.engineFor(size)
+		elif simulator is BitboardSimulator:
+			self.engine = bitboard
+		else:
+			self.engine = MatrixEngine(simulator)
+		# the computer places a 4 with this probability and a 2 otherwise
+		self.fourProbability = fourProbability
+		# optional ttable.TranspositionTable, shared across decisions by the caller
+		self.cache = cache
+		# chance branches less likely than this are not searched, 0 searches everything
+		self.epsilon = epsilon
+		# chance branches cut by epsilon so far: a value computed below a cut
+		# depends on the path probability, so it is not cached
+		self.prunes = 0
+		# perf_counter() time at which an iterative search gives up, None for no limit
+		self.deadline = None
+		# a threading.Event set by another thread to abandon the search, see thinker.py
+		self.cancel = None
+		self.completedDepth = 0
+		# {move: value} of the root moves an iterative search finished at the
+		# depth it ran out of time on, not used for the decision
+		self.partialValues = {}
+		# with a process pool the root moves are searched in parallel, and with
+		# splitChance every spawn below them is a separate task
+		self.pool = pool
+		self.splitChance = splitChance
+		# leaf evaluation, e.g. heuristics.Evaluator: a callable taking an engine
+		# board and returning points, optionally with evaluateBatch() for a list
+		# of boards; None scores leaves by the points gained alone
+		self.evaluator = evaluator
+		self.batchLeaves = hasattr(evaluator, 'evaluateBatch')
+		# expand whole plies as NumPy arrays (batch.plyRootValues) on packed
+		# boards; that search is exhaustive and ignores cache and epsilon, the
+		# deadline and cancel token are checked between its plies
+		self.batched = batched and batch is not None and self.engine is bitboard
+		# search and cache packed boards by their canonical image (symmetry.py), so
+		# one cache entry serves all 8 rotations and mirrors; only sound when the
+		# evaluator scores every image alike
+		self.canonicalize = (canonicalize and self.engine is bitboard and
+			(evaluator is None or getattr(evaluator, 'symmetric', False)))
+		# cache entries are only valid for the same board size, leaf evaluator and
+		# spawn odds, and packed boards of different sizes can be equal ints: they
+		# are kept apart by this prefix of every key
+		self.cacheSpace = (size, evaluator, fourProbability)
+		# called with the telemetry.SearchStats report of every decision
+		self.listener = listener
+		# also trace the memory of every decision for the listener, see telemetry.py
+		self.traceMemory = traceMemory
+		self.stats = None
+		# depth of the running search, so nodes know their ply from the root
+		self.searchDepth = depth_of_tree
+		# points the played move may fall short of the best one at full depth:
+		# the search stops early once the best move's lower bound is within
+		# this of every other move's upper bound, see decided()
+		self.margin = margin
+		# {move: (lower, upper) bound of its value at depth_of_tree}, set by decide()
+		self.rootBounds = None
+		# the position rootValues() searches, set by decide()
+		self.rootBoard = self.engine.encode([[0] * size for _ in range(size)])
+		self.rootScore = 0
+
+	def search(self, board, depth, probability=1.0):
+		'''expected points gained from a player node, children are generated lazily'''
+		if depth == 0:
+			return self.leafValue(board)
+		if self.stats is not None:
+			self.stats.countMax(self.searchDepth - depth)
+		best = None
+		for direction in range(4):
+			child, gained = self.engine.move(board, direction)
+			if child != board:
+				value = gained + self.chance(child, depth - 1, probability)
+				if best is None or value > best:
+					best = value
+		# no legal move left: the game is over and the node keeps its score
+		return self.gameOverValue(board) if best is None else best
+
+	def leafValue(self, board):
+		if self.stats is not None:
+			self.stats.leaves += 1
+		if self.evaluator is None:
+			return 0
+		return self.evaluator(board)
+
+	def gameOverValue(self, board):
+		'''leaf value of a lost position, less the evaluator's penalty for losing'''
+		return self.leafValue(board) - getattr(self.evaluator, 'lost', 0)
+
+	def chance(self, board, depth, probability=1.0):
+		'''expected points gained from a computer node, every empty tile is equally likely
+		to get a 2, or a 4 with self.fourProbability
+
+		probability is the chance of reaching this node from the root; children
+		below self.epsilon are scored with staticGain() instead of being searched,
+		and a node with such a cut below it is not cached
+		'''
+		if depth == 0:
+			return self.leafValue(board)
+		if self.cache is not None:
+			key = (self.cacheSpace, symmetry.canonicalKey(board) if self.canonicalize else board)
+			value = self.cache.get(key, depth)
+			if value is not None:
+				return value
+		# the last plies are cheap, only check the clock above them
+		if depth > 2:
+			self.checkStop()
+		if self.stats is not None:
+			self.stats.countChance(self.searchDepth - depth)
+		children = self.engine.spawns(board, self.fourProbability)
+		prunes = self.prunes
+		if depth == 2 and self.batchLeaves:
+			# staticGain() is search(child, 1), so pruning changes nothing here
+			value = self.batchSearch(children)
+		else:
+			value = 0
+			for child, childProbability in children:
+				if probability * childProbability < self.epsilon:
+					if depth > 2:
+						# one ply above the leaves staticGain() is the search itself
+						self.prunes += 1
+					if self.stats is not None:
+						self.stats.pruned += 1
+					value += childProbability * self.staticGain(child)
+				else:
+					value += childProbability * self.search(child, depth - 1, probability * childProbability)
+		if self.cache is not None and self.prunes == prunes:
+			self.cache.put(key, depth, value)
+		return value
+
+	def checkStop(self):
+		'''raise SearchTimeout past the deadline, SearchCancelled once cancelled'''
+		if self.deadline is not None and time.perf_counter() > self.deadline:
+			raise SearchTimeout()
+		if self.cancel is not None and self.cancel.is_set():
+			raise SearchCancelled()
+
+	def staticGain(self, board):
+		'''cheap estimate of a pruned player node: the value of its best single move'''
+		best = None
+		for direction in range(4):
+			child, gained = self.engine.move(board, direction)
+			if child != board:
+				value = gained + self.leafValue(child)
+				if best is None or value > best:
+					best = value
+		return self.gameOverValue(board) if best is None else best
+
+	def batchSearch(self, children):
+		'''expected search(board, 1) over (board, probability) pairs, all leaves evaluated in one batch'''
+		leaves = []
+		owners = []
+		gains = []
+		for k, (board, probability) in enumerate(children):
+			for direction in range(4):
+				child, gained = self.engine.move(board, direction)
+				if child != board:
+					leaves.append(child)
+					owners.append(k)
+					gains.append(gained)
+		if self.stats is not None:
+			self.stats.countMax(self.searchDepth - 1, len(children))
+			self.stats.leaves += len(leaves)
+		best = [None] * len(children)
+		if leaves:
+			values = self.evaluator.evaluateBatch(leaves)
+			if hasattr(values, 'tolist'):
+				values = values.tolist()
+			for k, gained, value in zip(owners, gains, values):
+				value += gained
+				if best[k] is None or value > best[k]:
+					best[k] = value
+		total = 0
+		for (board, probability), value in zip(children, best):
+			total += probability * (self.gameOverValue(board) if value is None else value)
+		return total
+
+	def rootValues(self, depth=None, order=None, found=None):
+		'''expectimax value of every legal root move, as a {move: value} dict
+
+		the moves are searched in the given order, by default left to right.
+		Each value is also put in found as soon as its move is finished, so a
+		search that times out leaves the moves it completed there
+		'''
+		if depth is None:
+			depth = self.depth_of_tree
+		if found is None:
+			found = {}
+		board = self.rootBoard
+		if self.canonicalize:
+			# search the canonical image of the root and map its moves back
+			board, k = symmetry.canonical(board)
+			if order is not None:
+				order = [symmetry.mapMove(d, k) for d in order]
+			mapped = {}
+			try:
+				self.boardValues(board, depth, order, mapped)
+			finally:
+				found.update((symmetry.unmapMove(d, k), value) for d, value in mapped.items())
+			return found
+		return self.boardValues(board, depth, order, found)
+
+	def valueBounds(self, board, depth):
+		'''(lower, upper) bound of chance(board, d) for every d <= depth, None if the
+		evaluator cannot bound its values
+
+		a move gains at most the sum of the tiles and a spawn adds at most 4 to
+		it, the points are never negative and leaves are within evaluator.bounds()
+		'''
+		if self.evaluator is None:
+			low = high = 0
+		elif hasattr(self.evaluator, 'bounds'):
+			low, high = self.evaluator.bounds()
+		else:
+			return None
+		lost = getattr(self.evaluator, 'lost', 0)
+		total = sum(sum(row) for row in self.engine.decode(board))
+		moves = depth // 2
+		return min(low, low - lost), high + moves * total + 2 * moves * (moves + 1)
+
+	def moveBounds(self, board, depth):
+		'''{move: valueBounds() of its child plus the points of the move and the score}'''
+		bounds = {}
+		for direction in range(4):
+			child, gained = self.engine.move(board, direction)
+			if child != board:
+				childBounds = self.valueBounds(child, depth - 1)
+				if childBounds is None:
+					return None
+				bounds[direction] = tuple(self.rootScore + gained + b for b in childBounds)
+		return bounds
+
+	def staticValues(self, board):
+		'''{move: points gained plus leaf value} of every legal move, a one-ply estimate'''
+		values = {}
+		for direction in range(4):
+			child, gained = self.engine.move(board, direction)
+			if child != board:
+				values[direction] = gained + self.leafValue(child)
+		return values
+
+	def boardValues(self, board, depth, order=None, values=None):
+		'''rootValues() of the root position given as board, filling values
+
+		the serial search leaves out the moves whose upper bound is below the
+		value of a move already searched: they cannot be best at this depth
+		'''
+		self.searchDepth = depth
+		if order is None:
+			static = self.staticValues(board)
+			order = sorted(static, key=lambda direction: -static[direction])
+		if values is None:
+			values = {}
+		if self.pool is not None:
+			return self.parallelRootValues(board, depth, order, values)
+		if self.batched:
+			values.update(batch.plyRootValues(board, depth, self.rootScore, self.evaluator,
+				self.fourProbability, self.checkStop))
+			return values
+		if self.stats is not None:
+			self.stats.countMax(0)
+		best = None
+		for direction in order:
+			child, gained = self.engine.move(board, direction)
+			if child == board:
+				continue
+			if best is not None:
+				bounds = self.valueBounds(child, depth - 1)
+				if bounds is not None and self.rootScore + gained + bounds[1] < best:
+					continue
+			values[direction] = self.rootScore + gained + self.chance(child, depth - 1)
+			if best is None or values[direction] > best:
+				best = values[direction]
+		return values
+
+	def parallelRootValues(self, board, depth, order, values):
+		'''rootValues() with the subtrees searched by self.pool, only boards cross processes'''
+		jobs = []
+		for direction in order:
+			child, gained = self.engine.move(board, direction)
+			if child == board:
+				continue
+			spawns = self.engine.spawns(child, self.fourProbability)
+			seconds = None if self.deadline is None else self.deadline - time.perf_counter()
+			if self.splitChance and depth >= 3 and min(p for _, p in spawns) >= self.epsilon:
+				futures = [(p, self.pool.submit(_workerSearch, self.size, spawn, depth - 2, self.epsilon,
+					p, seconds, True, self.evaluator, self.fourProbability, self.canonicalize))
+					for spawn, p in spawns]
+			else:
+				futures = [(1.0, self.pool.submit(_workerSearch, self.size, child, depth - 1, self.epsilon,
+					1.0, seconds, False, self.evaluator, self.fourProbability, self.canonicalize))]
+			jobs.append((direction, gained, futures))
+		try:
+			for direction, gained, futures in jobs:
+				total = 0
+				for probability, future in futures:
+					total += probability * self.result(future)
+				values[direction] = self.rootScore + gained + total
+		except (SearchTimeout, SearchCancelled):
+			for direction, gained, futures in jobs:
+				for probability, future in futures:
+					future.cancel()
+			raise
+		return values
+
+	def result(self, future):
+		'''future.result() of a pool search, given up on once the search is cancelled'''
+		if self.cancel is None:
+			return future.result()
+		while True:
+			try:
+				return future.result(timeout=0.01)
+			except FutureTimeout:
+				if self.cancel.is_set():
+					raise SearchCancelled()
+
+	def iterativeValues(self, timeLimit):
+		'''root values of the deepest search finished within timeLimit seconds
+
+		depths 1, 3, 5... up to depth_of_tree are searched in turn, so every
+		iteration ends on a player move like the original depth-3 tree. Each
+		iteration visits the root moves best-first by the previous values and,
+		with a cache, reuses the subtrees the previous iteration already scored.
+		The moves an unfinished iteration completed are left in partialValues,
+		the decision keeps the values and depth of the last finished one. The
+		first iteration always completes so there is a move to play, and the
+		search ends early once decided() holds for the best move.
+		'''
+		deadline = time.perf_counter() + timeLimit
+		values = self.rootValues(1)
+		self.completedDepth = 1
+		depth = 3
+		self.partialValues = {}
+		try:
+			while (depth <= self.depth_of_tree and time.perf_counter() < deadline and
+					not self.decided(values)):
+				# moves cut by their bound have no value and go last
+				order = sorted(range(4), key=lambda direction: -values.get(direction, float('-inf')))
+				self.deadline = deadline
+				self.partialValues = {}
+				values = self.rootValues(depth, order, self.partialValues)
+				self.partialValues = {}
+				self.completedDepth = depth
+				depth += 2
+		except SearchTimeout:
+			pass
+		finally:
+			self.deadline = None
+		return values
+
+	def decided(self, values):
+		'''True when the best move of values is within self.margin points of the best
+		one at any depth up to depth_of_tree
+
+		its lower bound is compared with the upper bound of every other move
+		(rootBounds), so no deeper search can make another move better by more
+		'''
+		if self.rootBounds is None or not values:
+			return False
+		best = max(values, key=lambda direction: (values[direction], -direction))
+		low = self.rootBounds[best][0] + (self.margin or 0)
+		return all(high < low for direction, (_, high) in self.rootBounds.items()
+			if direction != best)
+
+	def decide(self, board, score=0, budget=None):
+		'''best move for a tile matrix with the given score, as a Decision
+
+		depth-first expectimax to budget.depth plies: memory stays O(depth)
+		because children are scored as they are generated and then dropped.
+		With budget.seconds the search deepens iteratively until the time is
+		up and budget.depth is only the deepest it may go. budget may also be
+		a plain depth, None keeps depth_of_tree. With a listener the search is
+		counted and timed, see telemetry.py.
+		'''
+		if len(board) != self.size:
+			raise ValueError("a %dx%d board for a %dx%d search" % (len(board), len(board), self.size, self.size))
+		if budget is None:
+			budget = Budget(self.depth_of_tree)
+		elif not isinstance(budget, Budget):
+			budget = Budget(budget)
+		self.depth_of_tree = budget.depth
+		self.rootBoard = self.engine.encode(board)
+		self.rootScore = score
+		if self.listener is not None:
+			self.startStats()
+		try:
+			static = self.staticValues(self.rootBoard)
+			self.rootBounds = self.moveBounds(self.rootBoard, self.depth_of_tree)
+			if len(static) <= 1 or self.decided(static):
+				# a forced move, none at all or one no search can overtake
+				values = dict((direction, score + value) for direction, value in static.items())
+				self.completedDepth = 1
+			elif budget.seconds is None:
+				values = self.rootValues()
+				self.completedDepth = self.depth_of_tree
+			else:
+				values = self.iterativeValues(budget.seconds)
+		finally:
+			stats = self.stopStats()
+		if len(values) == 0:
+			move, value = -1, None
+		else:
+			move = max(values, key=lambda direction: (values[direction], -direction))
+			value = values[move]
+		if stats is not None:
+			self.listener(stats.report(move, self.completedDepth))
+		return Decision(move, value, self.completedDepth, values)
+
+	def startStats(self):
+		'''count the search in a new telemetry.SearchStats, timing moves and evaluations'''
+		self.stats = telemetry.SearchStats(self.cache, self.traceMemory)
+		self.untimed = (self.engine, self.evaluator)
+		self.engine = telemetry.TimedEngine(self.engine, self.stats)
+		# pool workers get the evaluator itself, they are not timed
+		if self.evaluator is not None and self.pool is None:
+			self.evaluator = telemetry.TimedEvaluator(self.evaluator, self.stats)
+
+	def stopStats(self):
+		'''undo startStats() and return its SearchStats, None if it was not started'''
+		stats = self.stats
+		if stats is not None:
+			stats.stop()
+			self.engine, self.evaluator = self.untimed
+			self.stats = None
+		return stats
+
+
+class MatrixEngine:
+	"""Search board representation for sizes the bitboard does not cover
+
+	boards are tuples of row tuples; unchanged rows are shared between a
+	board and its children
+	"""
+
+	def __init__(self, simulator=None):
+		self.simulator = simulator if simulator is not None else Simulator
+
+	def encode(self, matrix):
+		return tuple(tuple(row) for row in matrix)
+
+	def decode(self, board):
+		return [list(row) for row in board]
+
+	def move(self, board, direction):
+		'''return (new board, points gained) like bitboard.move()'''
+		simulator = self.simulator(self.decode(board), 0)
+		simulator.move(direction)
+		return self.encode(simulator.getMatrix()), simulator.getScore()
+
+	def spawns(self, board, fourProbability=0.0):
+		'''(board, probability) of every tile the computer may place in an empty cell'''
+		cells = [(i, j) for i in range(len(board)) for j in range(len(board)) if board[i][j] == 0]
+		children = []
+		for tile, probability in ((2, 1.0 - fourProbability), (4, fourProbability)):
+			if probability:
+				for i, j in cells:
+					row = board[i][:j] + (tile,) + board[i][j + 1:]
+					children.append((board[:i] + (row,) + board[i + 1:], probability / len(cells)))
+		return children
+
+
+class Simulator:
+	"""Simulation of the game"""
+
+	def __init__(self, matrix, score):
+		self.matrix = matrix
+		self.score = score
+
+	def getMatrix(self):
+            return self.matrix
+	
+	def getScore(self):
+            return self.score
+
+	def move(self, direction):
+		for i in range(0, direction):
+			self.rotateMatrixClockwise()
+		if self.canMove():
+			self.moveTiles()
+			self.mergeTiles()
+		for j in range(0, (4 - direction) % 4):
+			self.rotateMatrixClockwise()
+
+	def moveTiles(self):
+		# store the matrix before moving 
+		tm = self.matrix
+		size_board = len(self.matrix)
+
+		for i in range(0, size_board):      
+			for j in range(0, size_board - 1): 
+				while tm[i][j] == 0 and sum(tm[i][j:]) > 0:
+					for k in range(j, size_board - 1): 
+						tm[i][k] = tm[i][k + 1]
+					tm[i][size_board - 1] = 0  
+
+	def mergeTiles(self): 
+		tm = self.matrix
+		size_board = len(self.matrix)
+
+		for i in range(0, size_board):
+			for k in range(0, size_board - 1):
+				if tm[i][k] == tm[i][k + 1] and tm[i][k] != 0:
+					tm[i][k] = tm[i][k] * 2
+					tm[i][k + 1] = 0
+					self.score += tm[i][k]
+					self.moveTiles()
+
+	def checkIfCanGo(self):
+		tm = self.matrix
+		size_board = len(self.matrix)
+
+		for i in range(0, size_board ** 2): 
+			if tm[int(i / size_board)][i % size_board] == 0: 
+				return True		
+		for i in range(0, size_board):      
+			for j in range(0, size_board - 1):  
+				if tm[i][j] == tm[i][j + 1]:
+					return True
+				elif tm[j][i] == tm[j + 1][i]:
+					return True
+		return False
+
+	def canMove(self): 
+		tm = self.matrix
+		size_board = len(self.matrix)
+
+		for i in range(0, size_board):
+			for j in range(1, size_board):
+				if tm[i][j-1] == 0 and tm[i][j] > 0:
+					return True
+				elif (tm[i][j-1] == tm[i][j]) and tm[i][j-1] != 0:
+					return True
+		return False
+
+	def rotateMatrixClockwise(self):	
+		tm = self.matrix
+		size_board = len(self.matrix)
+
+		for i in range(0, int(size_board/2)): 
+			for k in range(i, size_board- i - 1): 
+				temp1 = tm[i][k]
+				temp2 = tm[size_board - 1 - k][i] 
+				temp3 = tm[size_board - 1 - i][size_board - 1 - k] 
+				temp4 = tm[k][size_board - 1 - i] 
+				tm[size_board - 1 - k][i] = temp1 
+				tm[size_board - 1 - i][size_board - 1 - k] = temp2 
+				tm[k][size_board - 1 - i] = temp3  
+				tm[i][k] = temp4	
@@ -0,0 +1,210 @@
+# Search boards for every board size the game offers
+#
+# engineFor(size) returns the board representation the expectimax uses:
+#   4x4           the 64-bit packed board of bitboard.py
+#   2x2, 3x3      PackedGrid, the same 4-bit packing with smaller row tables
+#   5x5 and up    TupleGrid, tuples of tile exponents with memoized row moves
+# All of them share the interface of the bitboard module: encode, decode,
+# move, spawns, emptyCells, place, canGo and maxTile.
+
+from __future__ import absolute_import, division, print_function
+
+import bitboard
+from bitboard import moveRowLeft
+
+_engines = {}
+
+
+def engineFor(size):
+	'''the shared search engine for an size x size board'''
+	if size == bitboard.SIZE:
+		return bitboard
+	engine = _engines.get(size)
+	if engine is None:
+		engine = PackedGrid(size) if size < bitboard.SIZE else TupleGrid(size)
+		_engines[size] = engine
+	return engine
+
+
+def _exponent(tile):
+	return tile.bit_length() - 1 if tile else 0
+
+
+def _spawnChildren(board, cells, fourProbability, place):
+	two = (1.0 - fourProbability) / len(cells)
+	children = [(place(board, cell, 1), two) for cell in cells]
+	if fourProbability:
+		four = fourProbability / len(cells)
+		children.extend((place(board, cell, 2), four) for cell in cells)
+	return children
+
+
+class PackedGrid:
+	"""An n x n board, n < 4, packed 4 bits per tile exponent into one int
+
+	cell (i, j) is nibble n * i + j and row moves are lookups in tables of
+	16 ** n entries, as in bitboard.py
+	"""
+
+	def __init__(self, size):
+		self.size = size
+		self.rowMask = (1 << (4 * size)) - 1
+		self.left = [0] * (self.rowMask + 1)
+		self.right = [0] * (self.rowMask + 1)
+		self.scoreLeft = [0] * (self.rowMask + 1)
+		self.scoreRight = [0] * (self.rowMask + 1)
+		for value in range(self.rowMask + 1):
+			row = [(value >> (4 * j)) & 0xF for j in range(size)]
+			moved, gained = moveRowLeft(row)
+			self.left[value] = self._packRow(moved)
+			self.scoreLeft[value] = gained
+			moved, gained = moveRowLeft(row[::-1])
+			self.right[value] = self._packRow(moved[::-1])
+			self.scoreRight[value] = gained
+
+	def _packRow(self, row):
+		value = 0
+		for j, exponent in enumerate(row):
+			value |= exponent << (4 * j)
+		return value
+
+	def encode(self, matrix):
+		board = 0
+		for i, row in enumerate(matrix):
+			for j, tile in enumerate(row):
+				board |= _exponent(tile) << (4 * (self.size * i + j))
+		return board
+
+	def decode(self, board):
+		matrix = []
+		for i in range(self.size):
+			row = []
+			for j in range(self.size):
+				exponent = (board >> (4 * (self.size * i + j))) & 0xF
+				row.append(1 << exponent if exponent else 0)
+			matrix.append(row)
+		return matrix
+
+	def transpose(self, board):
+		n = self.size
+		result = 0
+		for i in range(n):
+			for j in range(n):
+				result |= ((board >> (4 * (n * i + j))) & 0xF) << (4 * (n * j + i))
+		return result
+
+	def _applyRows(self, board, table, scores):
+		bits = 4 * self.size
+		moved = 0
+		gained = 0
+		for i in range(self.size):
+			row = (board >> (bits * i)) & self.rowMask
+			moved |= table[row] << (bits * i)
+			gained += scores[row]
+		return moved, gained
+
+	def move(self, board, direction):
+		'''return (new board, points gained) like bitboard.move()'''
+		if direction == 0:
+			return self._applyRows(board, self.left, self.scoreLeft)
+		if direction == 2:
+			return self._applyRows(board, self.right, self.scoreRight)
+		if direction == 1:
+			moved, gained = self._applyRows(self.transpose(board), self.left, self.scoreLeft)
+		else:
+			moved, gained = self._applyRows(self.transpose(board), self.right, self.scoreRight)
+		return self.transpose(moved), gained
+
+	def emptyCells(self, board):
+		return [k for k in range(self.size * self.size) if not (board >> (4 * k)) & 0xF]
+
+	def place(self, board, cell, exponent):
+		return board | (exponent << (4 * cell))
+
+	def spawns(self, board, fourProbability=0.0):
+		'''(board, probability) of every tile the computer may place in an empty cell'''
+		return _spawnChildren(board, self.emptyCells(board), fourProbability, self.place)
+
+	def canGo(self, board):
+		for direction in range(4):
+			if self.move(board, direction)[0] != board:
+				return True
+		return False
+
+	def maxTile(self, board):
+		exponent = 0
+		while board:
+			exponent = max(exponent, board & 0xF)
+			board >>= 4
+		return 1 << exponent if exponent else 0
+
+
+class TupleGrid:
+	"""An n x n board as a tuple of row tuples of tile exponents
+
+	rows are moved through a dict that memoizes every row seen so far, and
+	rows a move or a spawn leaves alone are shared with the parent board
+	"""
+
+	def __init__(self, size):
+		self.size = size
+		self.rowMoves = {}
+
+	def encode(self, matrix):
+		return tuple(tuple(_exponent(tile) for tile in row) for row in matrix)
+
+	def decode(self, board):
+		return [[1 << exponent if exponent else 0 for exponent in row] for row in board]
+
+	def _moveRow(self, row):
+		moved = self.rowMoves.get(row)
+		if moved is None:
+			result, gained = moveRowLeft(list(row))
+			moved = (tuple(result), gained)
+			self.rowMoves[row] = moved
+		return moved
+
+	def _applyRows(self, board, reverse):
+		rows = []
+		gained = 0
+		for row in board:
+			if reverse:
+				moved, points = self._moveRow(row[::-1])
+				moved = moved[::-1]
+			else:
+				moved, points = self._moveRow(row)
+			# keep the parent's row object when nothing moved
+			rows.append(row if moved == row else moved)
+			gained += points
+		return tuple(rows), gained
+
+	def move(self, board, direction):
+		'''return (new board, points gained) like bitboard.move()'''
+		if direction == 0 or direction == 2:
+			return self._applyRows(board, direction == 2)
+		moved, gained = self._applyRows(tuple(zip(*board)), direction == 3)
+		moved = tuple(zip(*moved))
+		return (board if moved == board else moved), gained
+
+	def emptyCells(self, board):
+		return [self.size * i + j for i, row in enumerate(board) for j, exponent in enumerate(row)
+			if exponent == 0]
+
+	def place(self, board, cell, exponent):
+		i, j = divmod(cell, self.size)
+		row = board[i][:j] + (exponent,) + board[i][j + 1:]
+		return board[:i] + (row,) + board[i + 1:]
+
+	def spawns(self, board, fourProbability=0.0):
+		'''(board, probability) of every tile the computer may place in an empty cell'''
+		return _spawnChildren(board, self.emptyCells(board), fourProbability, self.place)
+
+	def canGo(self, board):
+		for direction in range(4):
+			if self.move(board, direction)[0] != board:
+				return True
+		return False
+
+	def maxTile(self, board):
+		exponent = max(max(row) for row in board)
+		return 1 << exponent if exponent else 0
@@ -0,0 +1,155 @@
+# Leaf evaluation for the 2048 expectimax
+#
+# Every heuristic is a sum over the rows and columns of the packed board,
+# so each one is precomputed for all 65536 rows like the move tables in
+# bitboard.py. An Evaluator combines them with weights into one table per
+# row index, and a board costs eight lookups (four rows, four columns).
+# With NumPy installed, evaluateBatch() scores a whole array of boards with
+# the same tables.
+
+from __future__ import absolute_import, division, print_function
+
+import bitboard
+from bitboard import ROW_MASK, SIZE
+
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+# position weights of the corner heuristic, a snake ending in the (0, 0) corner
+CORNER_WEIGHTS = [[15, 14, 13, 12],
+                  [8, 9, 10, 11],
+                  [7, 6, 5, 4],
+                  [0, 1, 2, 3]]
+
+_features = None
+
+
+def _rowFeatures(row):
+	'''(empty, monotonicity, smoothness) of one unpacked row of exponents'''
+	empty = row.count(0)
+	increasing = 0
+	decreasing = 0
+	smoothness = 0
+	for k in range(SIZE - 1):
+		a, b = row[k], row[k + 1]
+		if a > b:
+			decreasing += a ** 4 - b ** 4
+		else:
+			increasing += b ** 4 - a ** 4
+		if a and b:
+			smoothness -= abs(a - b)
+	return empty, -min(increasing, decreasing), smoothness
+
+
+def features():
+	'''per-row tables of every heuristic, built on first use'''
+	global _features
+	if _features is None:
+		empty = [0] * (ROW_MASK + 1)
+		monotonicity = [0] * (ROW_MASK + 1)
+		smoothness = [0] * (ROW_MASK + 1)
+		corner = [[0] * (ROW_MASK + 1) for _ in range(SIZE)]
+		for value in range(ROW_MASK + 1):
+			row = [(value >> (4 * j)) & 0xF for j in range(SIZE)]
+			empty[value], monotonicity[value], smoothness[value] = _rowFeatures(row)
+			for i in range(SIZE):
+				corner[i][value] = sum(CORNER_WEIGHTS[i][j] * (1 << row[j] if row[j] else 0)
+					for j in range(SIZE))
+		_features = {'empty': empty, 'monotonicity': monotonicity,
+			'smoothness': smoothness, 'corner': corner}
+	return _features
+
+
+class Evaluator:
+	"""Weighted sum of the empty-cell, monotonicity, smoothness and corner heuristics
+
+	empty, monotonicity and smoothness are counted on rows and columns, corner
+	adds tile values weighted towards the (0, 0) corner. A zero weight turns a
+	heuristic off. evaluate() takes a packed 4x4 board and returns a value in
+	score points, added to the points gained on the way to the leaf; lost is
+	taken off positions where no move is left.
+	"""
+
+	def __init__(self, empty=270.0, monotonicity=47.0, smoothness=11.0, corner=0.1, lost=200000.0):
+		self.weights = (empty, monotonicity, smoothness, corner, lost)
+		self.lost = lost
+		# without the corner weights every rotation and mirror of a board scores the same
+		self.symmetric = not corner
+		tables = features()
+		# the same rows and columns table, rows also get their corner weights
+		lines = [empty * e + monotonicity * m + smoothness * s for e, m, s
+			in zip(tables['empty'], tables['monotonicity'], tables['smoothness'])]
+		self.columnTable = lines
+		if corner:
+			self.rowTables = [[line + corner * c for line, c in zip(lines, tables['corner'][i])]
+				for i in range(SIZE)]
+		else:
+			self.rowTables = [lines] * SIZE
+		self.arrays = None
+		self.range = None
+
+	def bounds(self):
+		'''(lowest, highest) value evaluate() can return, from the extremes of its tables'''
+		if self.range is None:
+			columns = (min(self.columnTable), max(self.columnTable))
+			self.range = (sum(min(table) for table in self.rowTables) + SIZE * columns[0],
+				sum(max(table) for table in self.rowTables) + SIZE * columns[1])
+		return self.range
+
+	def __reduce__(self):
+		# processes rebuild the tables from the weights instead of pickling them
+		return (Evaluator, self.weights)
+
+	def __eq__(self, other):
+		return isinstance(other, Evaluator) and self.weights == other.weights
+
+	def __ne__(self, other):
+		return not self == other
+
+	def __hash__(self):
+		return hash(self.weights)
+
+	def evaluate(self, board):
+		r0, r1, r2, r3 = self.rowTables
+		columns = bitboard.transpose(board)
+		table = self.columnTable
+		return (r0[board & ROW_MASK] + r1[(board >> 16) & ROW_MASK] +
+			r2[(board >> 32) & ROW_MASK] + r3[board >> 48] +
+			table[columns & ROW_MASK] + table[(columns >> 16) & ROW_MASK] +
+			table[(columns >> 32) & ROW_MASK] + table[columns >> 48])
+
+	def __call__(self, board):
+		return self.evaluate(board)
+
+	def evaluateBatch(self, boards):
+		'''values of a sequence of packed boards, vectorized when NumPy is available'''
+		if np is None:
+			return [self.evaluate(board) for board in boards]
+		if self.arrays is None:
+			self.arrays = ([np.array(table, dtype=np.float64) for table in self.rowTables],
+				np.array(self.columnTable, dtype=np.float64))
+		rowTables, columnTable = self.arrays
+		boards = np.asarray(boards, dtype=np.uint64)
+		columns = transposeBatch(boards)
+		mask = np.uint64(ROW_MASK)
+		values = np.zeros(boards.shape, dtype=np.float64)
+		for i in range(SIZE):
+			shift = np.uint64(16 * i)
+			values += rowTables[i][((boards >> shift) & mask).astype(np.intp)]
+			values += columnTable[((columns >> shift) & mask).astype(np.intp)]
+		return values
+
+
+def transposeBatch(boards):
+	'''bitboard.transpose() over a NumPy array of packed boards'''
+	u = np.uint64
+	a1 = boards & u(0xF0F00F0FF0F00F0F)
+	a2 = boards & u(0x0000F0F00000F0F0)
+	a3 = boards & u(0x0F0F00000F0F0000)
+	a = a1 | (a2 << u(12)) | (a3 >> u(12))
+	b1 = a & u(0xFF00FF0000FF00FF)
+	b2 = a & u(0x00FF00FF00000000)
+	b3 = a & u(0x00000000FF00FF00)
+	return b1 | (b2 >> u(24)) | (b3 << u(24))
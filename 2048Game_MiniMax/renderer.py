@@ -0,0 +1,75 @@
+# Incremental board drawing for the pygame 2048 window
+#
+# Tiles are rendered once per (value, tile size) into small surfaces and
+# then only blitted. BoardRenderer remembers what is on screen and redraws
+# the tiles whose value changed and the score when it changed, returning
+# the rectangles it touched for pygame.display.update().
+
+from __future__ import absolute_import, division, print_function
+import math
+
+import pygame
+
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+
+
+class BoardRenderer:
+	"""Draws the tile matrix and the score on a surface, redrawing only what changed
+
+	the board fills width x width pixels below a score bar of top pixels;
+	matrix[i][j] is drawn in column i, row j like the original printMatrix()
+	"""
+
+	def __init__(self, surface, tileFont, scoreFont, colors, width=400, top=100):
+		self.surface = surface
+		self.tileFont = tileFont
+		self.scoreFont = scoreFont
+		self.colors = colors
+		self.width = width
+		self.top = top
+		self.tiles = {}		# (value, tile size) -> pre-rendered tile surface
+		self.invalidate()
+
+	def invalidate(self):
+		'''forget what is on screen, the next draw() repaints everything'''
+		self.shown = {}
+		self.shownSize = None
+		self.shownScore = None
+
+	def tile(self, value, side):
+		'''the surface of one tile, rendered on first use'''
+		key = (value, side)
+		surface = self.tiles.get(key)
+		if surface is None:
+			surface = pygame.Surface((side, side))
+			surface.fill(self.colors.get(value, BLACK))
+			surface.blit(self.tileFont.render(str(value), 1, WHITE), (30, 30))
+			self.tiles[key] = surface
+		return surface
+
+	def draw(self, matrix, score):
+		'''bring the surface up to date, return the list of changed rectangles'''
+		size = len(matrix)
+		step = self.width / size
+		side = int(math.ceil(step))
+		rects = []
+		if size != self.shownSize:
+			self.invalidate()
+			self.shownSize = size
+			self.surface.fill(BLACK)
+			rects.append(self.surface.get_rect())
+		for i in range(size):
+			for j in range(size):
+				value = matrix[i][j]
+				if self.shown.get((i, j)) != value:
+					self.shown[(i, j)] = value
+					position = (int(i * step), int(j * step) + self.top)
+					rects.append(self.surface.blit(self.tile(value, side), position))
+		if score != self.shownScore:
+			self.shownScore = score
+			bar = pygame.Rect(0, 0, self.width, self.top)
+			self.surface.fill(BLACK, bar)
+			self.surface.blit(self.scoreFont.render("Score:" + str(score), 1, WHITE), (10, 20))
+			rects.append(bar)
+		return rects
@@ -0,0 +1,181 @@
+# Seeded spawns and an append-only binary replay log of 2048 games
+#
+# Every game starts with a game record and adds one move record per move:
+#   header   MAGIC, once at the start of the file
+#   game     b'G', size (u8), seed (u64), the starting board
+#   move     b'M', move (i8), spawn cell (u8), spawn exponent (u8), the board before the move
+# Boards are stored as tile exponents, two per byte up to 4x4 (the packed
+# layout of bitboard.py) and one per byte above. Since every move record
+# holds its board, each one can be searched again on its own.
+#
+# usage: python3 replay.py games.rpl [--depth 3 --weights ...]
+# re-plays every logged game with the engine, without pygame, and with
+# --depth also searches every logged position again and reports how long the
+# AI took and how often it chose the logged move
+
+from __future__ import absolute_import, division, print_function
+import argparse
+import contextlib
+import io
+import os
+import struct
+import time
+
+import bitboard
+import gridboard
+
+MAGIC = b'2048RPL1'
+_GAME = struct.Struct('<cBQ')
+_MOVE = struct.Struct('<cbBB')
+
+
+def spawn(engine, board, rng, fourProbability):
+	'''place a 2, or a 4 with fourProbability, on a random empty cell: (board, cell, exponent)
+
+	the rng is used the same way everywhere, so a seed decides the whole game
+	'''
+	cell = rng.choice(engine.emptyCells(board))
+	exponent = 2 if rng.random() < fourProbability else 1
+	return engine.place(board, cell, exponent), cell, exponent
+
+
+def _boardLength(size):
+	return (size * size + 1) // 2 if size <= bitboard.SIZE else size * size
+
+
+def _packBoard(size, board):
+	if size <= bitboard.SIZE:
+		return board.to_bytes(_boardLength(size), 'little')
+	return bytes(exponent for row in board for exponent in row)
+
+
+def _unpackBoard(size, data):
+	if size <= bitboard.SIZE:
+		return int.from_bytes(data, 'little')
+	return tuple(tuple(data[size * i:size * (i + 1)]) for i in range(size))
+
+
+class ReplayLog:
+	"""Writer appending games to a replay file, boards are engine boards of the game size"""
+
+	def __init__(self, path):
+		self.path = path
+		self.file = open(path, 'ab')
+		if self.file.tell() == 0:
+			self.file.write(MAGIC)
+		self.size = None
+
+	def startGame(self, size, seed, board):
+		self.size = size
+		self.file.write(_GAME.pack(b'G', size, seed) + _packBoard(size, board))
+
+	def addMove(self, board, move, cell, exponent):
+		'''record move played on board, followed by a spawn of 2 ** exponent on cell'''
+		self.file.write(_MOVE.pack(b'M', move, cell, exponent) + _packBoard(self.size, board))
+
+	def flush(self):
+		self.file.flush()
+
+	def close(self):
+		self.file.close()
+
+
+def readGames(path):
+	'''the games of a replay file as dicts with size, seed, board and a list of
+	(board, move, cell, exponent) records'''
+	with open(path, 'rb') as f:
+		data = f.read()
+	if not data.startswith(MAGIC):
+		raise ValueError("%s is not a 2048 replay log" % path)
+	games = []
+	offset = len(MAGIC)
+	while offset < len(data):
+		kind = data[offset:offset + 1]
+		if kind == b'G':
+			_, size, seed = _GAME.unpack_from(data, offset)
+			offset += _GAME.size
+			board = _unpackBoard(size, data[offset:offset + _boardLength(size)])
+			games.append({'size': size, 'seed': seed, 'board': board, 'moves': []})
+		elif kind == b'M' and games:
+			_, move, cell, exponent = _MOVE.unpack_from(data, offset)
+			offset += _MOVE.size
+			size = games[-1]['size']
+			board = _unpackBoard(size, data[offset:offset + _boardLength(size)])
+			games[-1]['moves'].append((board, move, cell, exponent))
+		else:
+			raise ValueError("corrupt replay log %s at byte %d" % (path, offset))
+		offset += _boardLength(games[-1]['size'])
+	return games
+
+
+def simulate(game):
+	'''play a logged game again with the engine: (score, final board, breaks)
+
+	breaks counts moves whose logged board is not where the previous move
+	left off, as after an undo or a loaded game; play goes on from the logged board
+	'''
+	engine = gridboard.engineFor(game['size'])
+	board = game['board']
+	score = 0
+	breaks = 0
+	for logged, move, cell, exponent in game['moves']:
+		if logged != board:
+			breaks += 1
+		board, gained = engine.move(logged, move)
+		score += gained
+		board = engine.place(board, cell, exponent)
+	return score, board, breaks
+
+
+def research(game, depth, timeLimit=None, evaluator=None):
+	'''search every logged position again: (moves matching the log, seconds spent)'''
+	from ai import Gametree
+	engine = gridboard.engineFor(game['size'])
+	agree = 0
+	elapsed = 0.0
+	for board, move, cell, exponent in game['moves']:
+		tree = Gametree(engine.decode(board), depth, 0,
+			evaluator=evaluator if game['size'] == bitboard.SIZE else None)
+		start = time.perf_counter()
+		with contextlib.redirect_stdout(io.StringIO()):
+			decision = tree.compute_decision(timeLimit)
+		elapsed += time.perf_counter() - start
+		agree += decision == move
+	return agree, elapsed
+
+
+def main():
+	parser = argparse.ArgumentParser(description="re-play and re-search games of a 2048 replay log")
+	parser.add_argument('path')
+	parser.add_argument('--depth', type=int, help="search every logged position again to this depth")
+	parser.add_argument('--time-limit', type=float, default=None)
+	parser.add_argument('--weights', type=float, nargs=5,
+		metavar=('EMPTY', 'MONO', 'SMOOTH', 'CORNER', 'LOST'))
+	args = parser.parse_args()
+
+	evaluator = None
+	if args.weights is not None:
+		from heuristics import Evaluator
+		evaluator = Evaluator(*args.weights)
+	games = readGames(args.path)
+	print("%s: %d games, %d bytes" % (args.path, len(games), os.path.getsize(args.path)))
+	start = time.perf_counter()
+	moves = 0
+	for game in games:
+		score, board, breaks = simulate(game)
+		moves += len(game['moves'])
+		line = "seed %-20d %dx%d %5d moves  score %7d  max tile %6d  breaks %d" % (game['seed'],
+			game['size'], game['size'], len(game['moves']), score,
+			gridboard.engineFor(game['size']).maxTile(board), breaks)
+		if args.depth is not None and game['moves']:
+			agree, seconds = research(game, args.depth, args.time_limit, evaluator)
+			line += "  same move %5.1f%%  %.2f ms/move" % (100.0 * agree / len(game['moves']),
+				1000 * seconds / len(game['moves']))
+		print(line)
+	seconds = time.perf_counter() - start
+	if args.depth is None and seconds:
+		print("%.0f moves/s re-played" % (moves / seconds))
+
+
+if __name__ == '__main__':
+	main()
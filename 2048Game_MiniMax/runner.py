@@ -0,0 +1,210 @@
+# Headless batch runner for the 2048 AI
+#
+# Plays full games with Gametree without pygame, spread over processes,
+# and reports scores, max tiles, speed and decision latency.
+#
+# usage: python3 runner.py --games 20 --depth 3 --json report.json --csv games.csv
+
+from __future__ import absolute_import, division, print_function
+import argparse
+import contextlib
+import csv
+import io
+import json
+import math
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import bitboard
+import gridboard
+from ai import FOUR_PROBABILITY, Gametree
+from heuristics import Evaluator
+from replay import ReplayLog, spawn
+from ttable import TranspositionTable
+
+
+def spawnTile(engine, board, rng):
+	'''place a 2, or a 4 one time in ten, on a random empty cell'''
+	return spawn(engine, board, rng, FOUR_PROBABILITY)[0]
+
+
+def playGame(seed, depth=3, timeLimit=None, epsilon=0.0, weights=None, size=bitboard.SIZE, telemetry=False,
+		record=False, margin=None, traceMemory=False):
+	'''play one game to the end and return its statistics
+
+	weights are the heuristics.Evaluator weights, None scores leaves by points alone;
+	the evaluator only knows 4x4 boards and is not used on other sizes. With
+	telemetry the search report of every move (see telemetry.py) is kept in
+	'decisions' and totalled in 'search', with traceMemory also its peak memory. With record the game is kept in
+	'replay' as the (board, moves) of a replay.ReplayLog game
+	'''
+	decisions = []
+	evaluator = Evaluator(*weights) if weights is not None and size == bitboard.SIZE else None
+	engine = gridboard.engineFor(size)
+	rng = random.Random(seed)
+	board = engine.encode([[0] * size for _ in range(size)])
+	board = spawnTile(engine, spawnTile(engine, board, rng), rng)
+	startBoard = board
+	records = []
+	cache = TranspositionTable()
+	score = 0
+	latencies = []
+	start = time.perf_counter()
+	while engine.canGo(board):
+		tree = Gametree(engine.decode(board), depth, score, cache=cache, epsilon=epsilon,
+			evaluator=evaluator, listener=decisions.append if telemetry else None, margin=margin,
+			traceMemory=traceMemory)
+		decisionStart = time.perf_counter()
+		with contextlib.redirect_stdout(io.StringIO()):
+			direction = tree.compute_decision(timeLimit)
+		latencies.append(time.perf_counter() - decisionStart)
+		moved, gained = engine.move(board, direction)
+		score += gained
+		spawned, cell, exponent = spawn(engine, moved, rng, FOUR_PROBABILITY)
+		if record:
+			records.append((board, direction, cell, exponent))
+		board = spawned
+	seconds = time.perf_counter() - start
+	game = {'seed': seed, 'score': score, 'max_tile': engine.maxTile(board),
+		'moves': len(latencies), 'seconds': seconds,
+		'moves_per_second': len(latencies) / seconds if seconds else 0.0,
+		'latencies': latencies}
+	if telemetry:
+		game['decisions'] = decisions
+		game['search'] = searchTotals(decisions)
+	if record:
+		game['replay'] = (startBoard, records)
+	return game
+
+
+def searchTotals(decisions):
+	'''sums of the telemetry reports of several decisions'''
+	totals = dict((name, sum(report[name] for report in decisions)) for name in
+		('seconds', 'leaves', 'pruned', 'cache_hits', 'cache_misses', 'move_seconds', 'eval_seconds'))
+	totals['nodes'] = sum(sum(report['max_nodes']) + sum(report['chance_nodes']) for report in decisions)
+	peaks = [report['peak_memory_kb'] for report in decisions if report['peak_memory_kb'] is not None]
+	totals['peak_memory_kb'] = max(peaks) if peaks else None
+	return totals
+
+
+def percentile(values, fraction):
+	'''nearest-rank percentile of a list of numbers'''
+	if not values:
+		return 0.0
+	ordered = sorted(values)
+	index = min(len(ordered) - 1, max(0, int(math.ceil(fraction * len(ordered))) - 1))
+	return ordered[index]
+
+
+def summarize(games):
+	latencies = [latency for game in games for latency in game['latencies']]
+	moves = sum(game['moves'] for game in games)
+	seconds = sum(game['seconds'] for game in games)
+	summary = {
+		'games': len(games),
+		'max_tile_distribution': dict(sorted(Counter(game['max_tile'] for game in games).items())),
+		'mean_score': sum(game['score'] for game in games) / len(games) if games else 0.0,
+		'best_score': max(game['score'] for game in games) if games else 0,
+		'mean_moves': moves / len(games) if games else 0.0,
+		'moves_per_second': moves / seconds if seconds else 0.0,
+		'latency_p50': percentile(latencies, 0.50),
+		'latency_p95': percentile(latencies, 0.95),
+		'latency_p99': percentile(latencies, 0.99),
+	}
+	if games and all('search' in game for game in games):
+		search = searchTotals([report for game in games for report in game['decisions']])
+		search['nodes_per_second'] = search['nodes'] / search['seconds'] if search['seconds'] else 0.0
+		summary['search'] = search
+	return summary
+
+
+def runGames(count, seed=0, workers=None, **options):
+	'''play count games, seeded seed, seed + 1, ..., on a process pool'''
+	seeds = [seed + k for k in range(count)]
+	with ProcessPoolExecutor(max_workers=workers) as pool:
+		futures = [pool.submit(playGame, gameSeed, **options) for gameSeed in seeds]
+		return [future.result() for future in futures]
+
+
+def writeJson(path, summary, games):
+	with open(path, 'w') as f:
+		json.dump({'summary': summary, 'games': games}, f, indent=2)
+
+
+def writeTelemetry(path, games):
+	'''every decision report as one line of JSON, tagged with the game seed'''
+	with open(path, 'w') as f:
+		for game in games:
+			for report in game['decisions']:
+				report = dict(report, seed=game['seed'])
+				f.write(json.dumps(report) + '\n')
+
+
+def writeReplay(path, games, size):
+	'''append the recorded games to a replay log'''
+	log = ReplayLog(path)
+	for game in games:
+		board, records = game['replay']
+		log.startGame(size, game['seed'], board)
+		for record in records:
+			log.addMove(*record)
+	log.close()
+
+
+def writeCsv(path, games):
+	fields = ['seed', 'score', 'max_tile', 'moves', 'seconds', 'moves_per_second',
+		'latency_p50', 'latency_p95', 'latency_p99']
+	with open(path, 'w') as f:
+		writer = csv.DictWriter(f, fieldnames=fields)
+		writer.writeheader()
+		for game in games:
+			row = dict((field, game[field]) for field in fields[:6])
+			for name, fraction in (('latency_p50', 0.50), ('latency_p95', 0.95), ('latency_p99', 0.99)):
+				row[name] = percentile(game['latencies'], fraction)
+			writer.writerow(row)
+
+
+def main():
+	parser = argparse.ArgumentParser(description="play 2048 games with the AI, no display")
+	parser.add_argument('--games', type=int, default=10)
+	parser.add_argument('--workers', type=int, default=None, help="processes, default one per cpu")
+	parser.add_argument('--seed', type=int, default=0)
+	parser.add_argument('--depth', type=int, default=3)
+	parser.add_argument('--size', type=int, default=bitboard.SIZE, help="board size, 2 to 7")
+	parser.add_argument('--time-limit', type=float, default=None, help="seconds per move, deepens iteratively")
+	parser.add_argument('--epsilon', type=float, default=0.0)
+	parser.add_argument('--margin', type=float, default=None,
+		help="stop searching once no deeper search can beat the best move by this many points")
+	parser.add_argument('--weights', type=float, nargs=5,
+		metavar=('EMPTY', 'MONO', 'SMOOTH', 'CORNER', 'LOST'),
+		help="score leaves with heuristics.Evaluator using these weights")
+	parser.add_argument('--json', help="write the report as JSON")
+	parser.add_argument('--csv', help="write one CSV row per game")
+	parser.add_argument('--telemetry', help="write the search report of every move as JSON lines")
+	parser.add_argument('--trace-memory', action='store_true',
+		help="with --telemetry, trace the peak memory of every move with tracemalloc (slow)")
+	parser.add_argument('--replay', help="append the games to this binary replay log, see replay.py")
+	args = parser.parse_args()
+
+	games = runGames(args.games, args.seed, args.workers, depth=args.depth,
+		timeLimit=args.time_limit, epsilon=args.epsilon, weights=args.weights, size=args.size,
+		telemetry=args.telemetry is not None, record=args.replay is not None, margin=args.margin,
+		traceMemory=args.trace_memory)
+	summary = summarize(games)
+	print(json.dumps(summary, indent=2))
+	if args.replay:
+		writeReplay(args.replay, games, args.size)
+		for game in games:
+			del game['replay']
+	if args.telemetry:
+		writeTelemetry(args.telemetry, games)
+	if args.json:
+		writeJson(args.json, summary, games)
+	if args.csv:
+		writeCsv(args.csv, games)
+
+
+if __name__ == '__main__':
+	main()
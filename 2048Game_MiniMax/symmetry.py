@@ -0,0 +1,94 @@
+# Dihedral symmetries of the packed 4x4 board
+#
+# Rotating or mirroring a board does not change its expectimax value as
+# long as the moves are mapped along with it, so the search can store one
+# entry for all 8 images of a position. canonical() picks the smallest image
+# as the representative; mapMove() and unmapMove() carry a direction to and
+# from that image.
+#
+# Symmetry k applies, in this order, a transpose (k & 4), a flip of the row
+# order (k & 2) and a mirror of every row (k & 1).
+
+from __future__ import absolute_import, division, print_function
+
+from bitboard import transpose
+
+COUNT = 8
+
+# a move as the (row, column) step it pushes the tiles in, see bitboard.py
+_STEPS = {0: (0, -1), 1: (-1, 0), 2: (0, 1), 3: (1, 0)}
+
+
+def mirror(board):
+	'''reverse the columns of every row: cell (i, j) goes to (i, 3 - j)'''
+	board = ((board & 0x0F0F0F0F0F0F0F0F) << 4) | ((board >> 4) & 0x0F0F0F0F0F0F0F0F)
+	return ((board & 0x00FF00FF00FF00FF) << 8) | ((board >> 8) & 0x00FF00FF00FF00FF)
+
+
+def flip(board):
+	'''reverse the order of the rows: cell (i, j) goes to (3 - i, j)'''
+	board = ((board & 0x0000FFFF0000FFFF) << 16) | ((board >> 16) & 0x0000FFFF0000FFFF)
+	return ((board & 0xFFFFFFFF) << 32) | (board >> 32)
+
+
+def image(board, k):
+	'''board under symmetry k'''
+	if k & 4:
+		board = transpose(board)
+	if k & 2:
+		board = flip(board)
+	if k & 1:
+		board = mirror(board)
+	return board
+
+
+def images(board):
+	'''the 8 images of a board, image k at index k'''
+	result = []
+	for base in (board, transpose(board)):
+		flipped = flip(base)
+		result.extend((base, mirror(base), flipped, mirror(flipped)))
+	return result
+
+
+def canonical(board):
+	'''(smallest image, symmetry that maps the board onto it)'''
+	best = board
+	symmetry = 0
+	for k, candidate in enumerate(images(board)):
+		if candidate < best:
+			best = candidate
+			symmetry = k
+	return best, symmetry
+
+
+def canonicalKey(board):
+	'''the smallest image alone, for cache keys'''
+	return min(images(board))
+
+
+def _stepImage(step, k):
+	di, dj = step
+	if k & 4:
+		di, dj = dj, di
+	if k & 2:
+		di = -di
+	if k & 1:
+		dj = -dj
+	return di, dj
+
+
+_directions = dict((step, direction) for direction, step in _STEPS.items())
+# MOVE_IMAGES[k][d]: the move on image k that matches move d on the board
+MOVE_IMAGES = [[_directions[_stepImage(_STEPS[d], k)] for d in range(4)] for k in range(COUNT)]
+_MOVE_SOURCES = [[MOVE_IMAGES[k].index(d) for d in range(4)] for k in range(COUNT)]
+
+
+def mapMove(direction, k):
+	'''direction on the board to the matching direction on image k'''
+	return MOVE_IMAGES[k][direction]
+
+
+def unmapMove(direction, k):
+	'''direction on image k back to the matching direction on the board'''
+	return _MOVE_SOURCES[k][direction]
@@ -0,0 +1,137 @@
+# Per-decision search telemetry for the 2048 AI
+#
+# Gametree(..., listener=f) counts what compute_decision() does and calls
+# f(report) with a dict once the move is chosen:
+#   move, depth, seconds          the decision and how long it took
+#   max_nodes, chance_nodes       expanded nodes per ply, index 0 is the root
+#   leaves, pruned                leaves evaluated, chance children cut by epsilon
+#   cache_hits, cache_misses      transposition table lookups of this decision
+#   move_calls, move_seconds      board moves simulated and the time spent on them
+#   eval_calls, eval_seconds      evaluator calls (a batch counts once) and their time
+#   peak_memory_kb                peak of the memory traced by tracemalloc during the
+#                                 decision with traceMemory, else None
+# Nodes searched by pool workers or by the batched search are not counted,
+# nodes of an iteration cut short by the time limit are.
+# The timers wrap every move and evaluation, so they slow the search down a
+# little while a listener is attached. Tracing memory slows it down a lot
+# more, enough to change the depth a timed search reaches, so it is only done
+# with Gametree(..., traceMemory=True), and never while the caller is already
+# running tracemalloc.
+
+from __future__ import absolute_import, division, print_function
+import json
+import logging
+import time
+import tracemalloc
+
+
+class SearchStats:
+	"""Counters of one compute_decision() call"""
+
+	def __init__(self, cache=None, traceMemory=False):
+		self.maxNodes = {}
+		self.chanceNodes = {}
+		self.leaves = 0
+		self.pruned = 0
+		self.moveCalls = 0
+		self.moveSeconds = 0.0
+		self.evalCalls = 0
+		self.evalSeconds = 0.0
+		self.cache = cache
+		self.cacheStart = (cache.hits, cache.misses) if cache is not None else (0, 0)
+		# trace the allocations of this decision, unless the caller traces its own
+		self.tracing = traceMemory and not tracemalloc.is_tracing()
+		if self.tracing:
+			tracemalloc.start()
+		self.peakMemory = None
+		self.start = time.perf_counter()
+
+	def countMax(self, ply, count=1):
+		self.maxNodes[ply] = self.maxNodes.get(ply, 0) + count
+
+	def countChance(self, ply):
+		self.chanceNodes[ply] = self.chanceNodes.get(ply, 0) + 1
+
+	def stop(self):
+		'''take the peak memory of the decision and stop the trace started for it'''
+		if self.tracing:
+			self.peakMemory = tracemalloc.get_traced_memory()[1] // 1024
+			tracemalloc.stop()
+			self.tracing = False
+
+	def report(self, move, depth):
+		'''the telemetry of the finished decision as a dict of plain values'''
+		plies = max(list(self.maxNodes) + list(self.chanceNodes) + [-1]) + 1
+		hits, misses = self.cacheStart
+		if self.cache is not None:
+			hits = self.cache.hits - hits
+			misses = self.cache.misses - misses
+		return {
+			'move': move,
+			'depth': depth,
+			'seconds': time.perf_counter() - self.start,
+			'max_nodes': [self.maxNodes.get(ply, 0) for ply in range(plies)],
+			'chance_nodes': [self.chanceNodes.get(ply, 0) for ply in range(plies)],
+			'leaves': self.leaves,
+			'pruned': self.pruned,
+			'cache_hits': hits,
+			'cache_misses': misses,
+			'move_calls': self.moveCalls,
+			'move_seconds': self.moveSeconds,
+			'eval_calls': self.evalCalls,
+			'eval_seconds': self.evalSeconds,
+			'peak_memory_kb': self.peakMemory,
+		}
+
+
+class TimedEngine:
+	"""Engine wrapper adding the time of every move() to a SearchStats"""
+
+	def __init__(self, engine, stats):
+		self.engine = engine
+		self.stats = stats
+
+	def move(self, board, direction):
+		start = time.perf_counter()
+		result = self.engine.move(board, direction)
+		self.stats.moveSeconds += time.perf_counter() - start
+		self.stats.moveCalls += 1
+		return result
+
+	def __getattr__(self, name):
+		return getattr(self.engine, name)
+
+
+class TimedEvaluator:
+	"""Evaluator wrapper adding the time of every evaluation to a SearchStats"""
+
+	def __init__(self, evaluator, stats):
+		self.evaluator = evaluator
+		self.stats = stats
+
+	def __call__(self, board):
+		start = time.perf_counter()
+		value = self.evaluator(board)
+		self.stats.evalSeconds += time.perf_counter() - start
+		self.stats.evalCalls += 1
+		return value
+
+	def evaluateBatch(self, boards):
+		start = time.perf_counter()
+		values = self.evaluator.evaluateBatch(boards)
+		self.stats.evalSeconds += time.perf_counter() - start
+		self.stats.evalCalls += 1
+		return values
+
+	def __getattr__(self, name):
+		return getattr(self.evaluator, name)
+
+
+def logListener(logger=None, level=logging.INFO):
+	'''listener writing every report to a logger as one line of JSON'''
+	if logger is None:
+		logger = logging.getLogger('2048.search')
+
+	def listener(report):
+		logger.log(level, json.dumps(report))
+	return listener
@@ -3,10 +3,15 @@ from __future__ import absolute_import, division, print_function
 import copy
 import random
 import heapq
+import bitboard
+import expectimax
+# the game simulator is shared with ai.py
+from expectimax import Simulator
 MOVES = {0: 'up', 1: 'left', 2: 'down', 3: 'right'}
 PLAYERS = {'chance': 0, 'computer': 1}
 class State:	
 	"""game state, node of the GameTree"""
+	__slots__ = ('matrix', 'player', 'score', 'children', 'isTerminal', 'move')
 	def __init__(self, matrix, player, score):
 		self.matrix = matrix
 		self.player =player
@@ -40,11 +45,26 @@ class State:
 		
 class Gametree:
 	"""main class for the AI"""
-	def __init__(self, root_state, depth_of_tree, current_score): 
+	def __init__(self, root_state, depth_of_tree, current_score, cache=None): 
 		'''construct a game tree from any state of the game'''
 		self.stateRoot = State(root_state, PLAYERS['chance'], current_score)
 		self.depth_of_tree =depth_of_tree
 		self.stateAndChildren =  {} 	# key: state value:a list of children
+		self.cache = cache		# optional ttable.TranspositionTable
+	def cacheKey(self, state):
+		'''(tagged board, remaining depth) of a non-root state in the depth-3 tree'''
+		matrix = state.getMatrix()
+		if len(matrix) == bitboard.SIZE:
+			board = bitboard.encode(matrix)
+		else:
+			board = tuple(tuple(row) for row in matrix)
+		# the tree caches points gained, expectimax.decide() expectimax values:
+		# the tag keeps them apart when both share self.cache
+		board = ('tree', board)
+		# chance players sit on layer 2 and computers on layer 1
+		if state.getPlayer() == PLAYERS['chance']:
+			return board, 1
+		return board, 2
 	def subTreeGenerator(self,state,isTerminal):	
 		childrenStates_list= []
 		if state.getPlayer() == PLAYERS['chance']: 
@@ -86,9 +106,9 @@ class Gametree:
 		if( depth == 3):
 			self.subTreeGenerator(self.stateRoot, False) #layer 1
 			for i in range(0, len(self.stateAndChildren[self.stateRoot])): #layer 2
-			    self.subTreeGenerator(self.stateAndChildren[self.stateRoot][i], False)
+				self.subTreeGenerator(self.stateAndChildren[self.stateRoot][i], False)
 			for i in range(0, len(self.stateAndChildren[self.stateRoot])):  #layer 3
-			    for j in range(0, len(self.stateAndChildren[ self.stateAndChildren[self.stateRoot][i] ]) ):
+				for j in range(0, len(self.stateAndChildren[ self.stateAndChildren[self.stateRoot][i] ]) ):
 					self.subTreeGenerator( self.stateAndChildren[ self.stateAndChildren[self.stateRoot][i] ][j], True )
 		elif( depth == 1):
 			self.subTreeGenerator(self.stateRoot, True) #layer 1
@@ -99,7 +119,18 @@ class Gametree:
 		"""Compute minimax values"""
 		if state.getIsTerminal():
 		    return state.payoff()
-		elif state.getPlayer() == PLAYERS['chance']:
+		elif self.cache is not None and state is not self.stateRoot:
+			# cached values are the points gained below the state
+			board, depth = self.cacheKey(state)
+			gained = self.cache.get(board, depth)
+			if gained is None:
+				gained = self.childrenValue(state) - state.getScore()
+				self.cache.put(board, depth, gained)
+			return state.getScore() + gained
+		return self.childrenValue(state)
+	def childrenValue(self, state):
+		"""Minimax value of a non-terminal state from its children"""
+		if state.getPlayer() == PLAYERS['chance']:
 		    value = float('-inf')
 		    for i in range(0, len( self.stateAndChildren[state])):
 		       value = max( value, self.minimax( self.stateAndChildren[state][i] ) )
@@ -114,115 +145,43 @@ class Gametree:
 			
 # funciton to be called by 2048.py
 	def compute_decision(self):
-		'''function to return best decision to game'''
+		'''function to return best decision to game, searched by expectimax.decide()'''
+		self.stateRoot.print_max_tile()
+		# like this tree, the computer only places 2s
+		decision = expectimax.decide(self.stateRoot.getMatrix(), self.stateRoot.getScore(),
+			self.depth_of_tree, cache=self.cache, fourProbability=0.0)
+		if decision.move == -1:
+			return -1
+
+		print ("next move:", MOVES[decision.move])
+		print ("expectimax", decision.value )
+
+		return decision.move
+
+	def compute_tree_decision(self):
+		'''best decision from the explicit depth-3 tree built by growTree()'''
 		self.growTree(self.stateRoot,3) 
 		self.stateRoot.print_max_tile()
 	
-		# fird the max Minimax children
+		children = self.stateAndChildren[self.stateRoot]
+		if len(children) == 0:
+			return -1
+		if len(children) == 1:
+			# a forced move needs no search
+			print ("next move:", MOVES[children[0].getMovement()])
+			return children[0].getMovement()
+	
+		# find the max Minimax children, each child is valued once, most points first;
+		# ties go to the lowest move like the generation order did
 		max_minimax = 0
-		max_minimax_index = 0
-		for i in range( len(self.stateAndChildren[self.stateRoot])): 
-			# print ("minimax ", self.stateAndChildren[self.stateRoot][i])
-			if self.minimax( self.stateAndChildren[self.stateRoot][i] ) > max_minimax:
-				max_minimax = self.minimax( self.stateAndChildren[self.stateRoot][i] )
-				max_minimax_index = i
-		max_minimax_state = self.stateAndChildren[self.stateRoot][max_minimax_index]
-		#Replace the following decision with what you compute
-		optimal_move = max_minimax_state.getMovement()
+		optimal_move = children[0].getMovement()
+		for child in sorted(children, key=lambda child: -child.getScore()):
+			value = self.minimax(child)
+			if value > max_minimax or (value == max_minimax and child.getMovement() < optimal_move):
+				max_minimax = value
+				optimal_move = child.getMovement()
 		
 		print ("next move:", MOVES[optimal_move])
-		print ("expectimax", self.minimax(self.stateRoot) )
+		print ("expectimax", max_minimax )
 		
 		return optimal_move
-
-#	Game simulator (3 points)
-# You can mostly copy/paste the game engine code to create a game simulator. 
-# It will be used to return the game state (and evaluate its score) after the player 
-# makes any move from any reasonable game state.
-class Simulator:
-	"""Simulation of the game"""
-	def __init__(self, matrix, score):
-		self.matrix = matrix
-		self.score = score
-	def getMatrix(self):
-            return self.matrix
-	
-	def getScore(self):
-            return self.score
-	def move(self, direction):
-		for i in range(0, direction):
-			self.rotateMatrixClockwise()
-		if self.canMove():
-			self.moveTiles()
-			self.mergeTiles()
-		for j in range(0, (4 - direction) % 4):
-			self.rotateMatrixClockwise()
-	# placeRandomTile() removed
-	
-	def moveTiles(self):
-		# store the matrix before moving 
-		tm = self.matrix
-		size_board = len(self.matrix)
-		for i in range(0, size_board):      
-			for j in range(0, size_board - 1): 
-				while tm[i][j] == 0 and sum(tm[i][j:]) > 0:
-					for k in range(j, size_board - 1): 
-						tm[i][k] = tm[i][k + 1]
-					tm[i][size_board - 1] = 0  
-	def mergeTiles(self): 
-		tm = self.matrix
-		size_board = len(self.matrix)
-		for i in range(0, size_board):
-			for k in range(0, size_board - 1):
-				if tm[i][k] == tm[i][k + 1] and tm[i][k] != 0:
-					tm[i][k] = tm[i][k] * 2
-					tm[i][k + 1] = 0
-					self.score += tm[i][k]
-					self.moveTiles()
-           
-	def checkIfCanGo(self):
-		tm = self.matrix
-		size_board = len(self.matrix)
-		for i in range(0, size_board ** 2): 
-			if tm[int(i / size_board)][i % size_board] == 0: 
-				return True		
-		for i in range(0, size_board):      
-			for j in range(0, size_board - 1):  
-				if tm[i][j] == tm[i][j + 1]:
-					return True
-				elif tm[j][i] == tm[j + 1][i]:
-					return True
-		return False
-	
-	def canMove(self): 
-		tm = self.matrix
-		size_board = len(self.matrix)
-		for i in range(0, size_board):
-			for j in range(1, size_board):
-				if tm[i][j-1] == 0 and tm[i][j] > 0:
-					return True
-				elif (tm[i][j-1] == tm[i][j]) and tm[i][j-1] != 0:
-					return True
-		return False
-	# saveGameState() 	removed
-	# loadGameState()	removed
-	def rotateMatrixClockwise(self):	
-		tm = self.matrix
-		size_board = len(self.matrix)
-		for i in range(0, int(size_board/2)): 
-			for k in range(i, size_board- i - 1): 
-				temp1 = tm[i][k]
-				temp2 = tm[size_board - 1 - k][i] 
-				temp3 = tm[size_board - 1 - i][size_board - 1 - k] 
-				temp4 = tm[k][size_board - 1 - i] 
-				tm[size_board - 1 - k][i] = temp1 
-				tm[size_board - 1 - i][size_board - 1 - k] = temp2 
-				tm[k][size_board - 1 - i] = temp3  
-				tm[i][k] = temp4	
-	def convertToLinearMatrix(self):  
-		m = []
-		size_board = len(self.matrix)
-		for i in range(0, size_board ** 2):
-			m.append(self.matrix[int(i / size_board)][i % size_board]) ##
-		m.append(self.matrixBeforeScore)
-		return m
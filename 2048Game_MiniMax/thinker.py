@@ -0,0 +1,76 @@
+# Background thinking for the pygame 2048 window
+#
+# The expectimax runs on a daemon thread so the window keeps handling
+# events while the AI searches. Every search gets its own cancel token
+# (a threading.Event checked by Expectimax.chance()); cancel() sets it and
+# waits the few milliseconds the search needs to notice, so a cancelled
+# search never overlaps the next one on the shared transposition table.
+
+from __future__ import absolute_import, division, print_function
+import threading
+
+from expectimax import SearchCancelled
+
+
+class Thinker:
+	"""Runs Gametree.compute_decision() off the UI thread
+
+	start() begins a search, poll() returns its move once it is ready and
+	None before, cancel() abandons it
+	"""
+
+	def __init__(self):
+		self.lock = threading.Lock()
+		self.token = None
+		self.thread = None
+		self.outcome = None		# (move,) or (exception,) of the finished search
+
+	def thinking(self):
+		'''True from start() until poll() has returned the move or cancel()'''
+		return self.token is not None
+
+	def start(self, tree, timeLimit=None):
+		'''search tree on the background thread, after cancelling any running search'''
+		self.cancel()
+		token = threading.Event()
+		tree.cancel = token
+		self.token = token
+		self.thread = threading.Thread(target=self._think, args=(tree, timeLimit, token))
+		self.thread.daemon = True
+		self.thread.start()
+
+	def _think(self, tree, timeLimit, token):
+		try:
+			outcome = (tree.compute_decision(timeLimit), None)
+		except SearchCancelled:
+			return
+		except Exception as error:
+			outcome = (None, error)
+		with self.lock:
+			if token is self.token:
+				self.outcome = outcome
+
+	def poll(self):
+		'''the move of the finished search, None while it is still thinking'''
+		with self.lock:
+			outcome, self.outcome = self.outcome, None
+		if outcome is None:
+			return None
+		self.token = None
+		self.thread = None
+		move, error = outcome
+		if error is not None:
+			raise error
+		return move
+
+	def cancel(self):
+		'''stop the running search and drop its move'''
+		token, thread = self.token, self.thread
+		if token is not None:
+			token.set()
+		if thread is not None:
+			thread.join()
+		with self.lock:
+			self.token = None
+			self.thread = None
+			self.outcome = None
@@ -0,0 +1,57 @@
+# Transposition table for the 2048 expectimax
+#
+# Entries map (board, remaining depth) to the expected points gained below
+# that node. Values are relative to the node's score, so one entry serves
+# every path that reaches the same board, whatever the score on the way.
+# Expectimax prefixes its boards with the board size, evaluator and spawn
+# odds, so one table can be shared by searches of different games.
+
+from __future__ import absolute_import, division, print_function
+from collections import OrderedDict
+
+
+class TranspositionTable:
+	"""Bounded cache of expectimax values with LRU eviction"""
+
+	def __init__(self, capacity=500000):
+		self.capacity = capacity
+		self.entries = OrderedDict()
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def get(self, board, depth):
+		'''cached value or None; a hit marks the entry as recently used'''
+		key = (board, depth)
+		value = self.entries.get(key)
+		if value is None:
+			self.misses += 1
+			return None
+		self.entries.move_to_end(key)
+		self.hits += 1
+		return value
+
+	def put(self, board, depth, value):
+		key = (board, depth)
+		self.entries[key] = value
+		self.entries.move_to_end(key)
+		if len(self.entries) > self.capacity:
+			self.entries.popitem(last=False)
+			self.evictions += 1
+
+	def hitRate(self):
+		lookups = self.hits + self.misses
+		return self.hits / lookups if lookups else 0.0
+
+	def stats(self):
+		return {'size': len(self.entries), 'capacity': self.capacity, 'hits': self.hits,
+			'misses': self.misses, 'evictions': self.evictions, 'hit_rate': self.hitRate()}
+
+	def clear(self):
+		self.entries.clear()
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def __len__(self):
+		return len(self.entries)
@@ -0,0 +1,104 @@
+# Benchmarks for the gomoku MCTS
+#
+# usage: python3 benchmark.py [name ...]
+# with no names every benchmark is run
+
+from __future__ import absolute_import, division, print_function
+import contextlib
+import io
+import random
+import sys
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bitboard import Bitboard
+from mcts import MCTS
+
+# a few opening stones, so rollouts start from a contested position
+OPENING = [(5, 5, 'b'), (5, 6, 'w'), (6, 5, 'b'), (4, 4, 'w'), (6, 6, 'b'), (7, 7, 'w')]
+
+
+def openingGrid():
+    grid = [list('.' * 11) for _ in range(11)]
+    for r, c, piece in OPENING:
+        grid[r][c] = piece
+    return grid
+
+
+def perSecond(function, seconds=2.0):
+    '''calls of function per second, run for about seconds'''
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        function()
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def benchReuse(moves=20, iterations=1000):
+    '''iterations carried over to the next move when one MCTS plays both sides'''
+    random.seed(2019)
+    search = MCTS(openingGrid(), 'b')
+    reused = 0
+    for move in range(moves):
+        with contextlib.redirect_stdout(io.StringIO()):
+            action, stats = search.uct_search(iterations)
+        reused += stats['reused']
+        search.advance(*action)
+        if search.board.game_over:
+            moves = move + 1
+            break
+    print("%d moves of self-play, %d iterations each: %.0f iterations reused per move (%.0f%%)"
+        % (moves, iterations, reused / moves, 100.0 * reused / (moves * iterations)))
+
+
+def benchRollouts():
+    '''random playouts per second from the opening position'''
+    random.seed(2019)
+    grid = openingGrid()
+    print("Bitboard.rollout  %8.0f rollouts/s" % perSecond(lambda: Bitboard(grid, 'b').rollout()))
+    search = MCTS(grid, 'b')
+    print("MCTS iteration    %8.0f iterations/s" % perSecond(lambda: search.iterate()))
+
+
+def benchSearch():
+    '''uct_search() statistics from the opening position for a few budgets'''
+    random.seed(2019)
+    print("budget            iterations  seconds  tree size  max depth  rollouts/s")
+    for label, iterations, seconds in (('100 iterations', 100, None), ('1000 iterations', 1000, None),
+            ('0.1 s', None, 0.1), ('1 s', None, 1.0)):
+        with contextlib.redirect_stdout(io.StringIO()):
+            move, stats = MCTS(openingGrid(), 'b').uct_search(iterations, seconds)
+        print("%-16s %11d %8.3f %10d %10d %11.0f" % (label, stats['iterations'], stats['seconds'],
+            stats['tree_size'], stats['max_depth'], stats['rollouts_per_second']))
+
+
+def benchParallel(seconds=1.0):
+    '''rollouts in a second of search: one process, root-parallel and leaf-parallel'''
+    random.seed(2019)
+    pool = ProcessPoolExecutor()
+    # start the workers before timing
+    MCTS(openingGrid(), 'b', pool=pool).root_parallel(1, None)
+    print("mode         iterations  tree size  rollouts/s")
+    for label, options in (('serial', {}), ('root', {'pool': pool, 'parallel': 'root'}),
+            ('leaf', {'pool': pool, 'parallel': 'leaf'})):
+        with contextlib.redirect_stdout(io.StringIO()):
+            move, stats = MCTS(openingGrid(), 'b', **options).uct_search(seconds=seconds)
+        print("%-12s %10d %10d %11.0f" % (label, stats['iterations'], stats['tree_size'],
+            stats['rollouts_per_second']))
+    pool.shutdown()
+    print("%d cpus" % (os.cpu_count() or 1))
+
+
+BENCHMARKS = {
+    'parallel': benchParallel,
+    'reuse': benchReuse,
+    'rollouts': benchRollouts,
+    'search': benchSearch,
+}
+
+if __name__ == '__main__':
+    for name in sys.argv[1:] or sorted(BENCHMARKS):
+        print("==", name)
+        BENCHMARKS[name]()
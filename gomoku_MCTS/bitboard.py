@@ -0,0 +1,207 @@
+# Bitboard of the 11x11 gomoku grid
+#
+# The stones of each player are one int, with bit r * WIDTH + c set for a
+# stone on (r, c). Rows are WIDTH = SIZE + 1 bits wide and the extra bit of
+# every row stays empty, so a line shifted along its direction never wraps
+# into the next row. Five in a row through a new stone is then a few shifts
+# and ANDs on the nine cells of each line through it, instead of walking the
+# grid cell by cell in eight directions.
+#
+# The moves worth trying are the empty cells within DISTANCE of a stone.
+# Bitboard keeps them in a list as stones are placed and taken back, at a
+# cost of one update per neighbour of the stone, so a rollout picks its
+# next move without scanning the grid.
+
+from __future__ import absolute_import, division, print_function
+import random
+
+SIZE = 11
+WIDTH = SIZE + 1
+# moves are tried on empty cells this many rows or columns from a stone
+DISTANCE = 1
+# (row step, column step) of the four lines through a cell: east, south-west, south, south-east
+DIRECTIONS = ((0, 1), (1, -1), (1, 0), (1, 1))
+
+
+def index(r, c):
+    return r * WIDTH + c
+
+
+def _lines(r, c):
+    '''(mask, bit step) of the up to nine cells around (r, c) on each of its four lines'''
+    lines = []
+    for dr, dc in DIRECTIONS:
+        mask = 0
+        for i in range(-4, 5):
+            if 0 <= r + dr * i < SIZE and 0 <= c + dc * i < SIZE:
+                mask |= 1 << index(r + dr * i, c + dc * i)
+        lines.append((mask, dr * WIDTH + dc))
+    return tuple(lines)
+
+# lines through every cell, by bit index
+LINES = [_lines(i // WIDTH, i % WIDTH) if i % WIDTH < SIZE else () for i in range(SIZE * WIDTH)]
+
+
+def five(stones, r, c):
+    '''True if stones hold five in a row through (r, c)'''
+    for mask, step in LINES[index(r, c)]:
+        line = stones & mask
+        pairs = line & (line >> step)
+        if pairs & (pairs >> 2 * step) & (line >> 4 * step):
+            return True
+    return False
+
+
+def _neighbours(i, distance):
+    r, c = i // WIDTH, i % WIDTH
+    return tuple(index(r + dr, c + dc) for dr in range(-distance, distance + 1)
+        for dc in range(-distance, distance + 1)
+        if (dr or dc) and 0 <= r + dr < SIZE and 0 <= c + dc < SIZE)
+
+# distance -> cells around every cell, by bit index
+_neighbourhoods = {}
+
+
+def neighbourhood(distance):
+    if distance not in _neighbourhoods:
+        _neighbourhoods[distance] = [_neighbours(i, distance) if i % WIDTH < SIZE else ()
+            for i in range(SIZE * WIDTH)]
+    return _neighbourhoods[distance]
+
+
+class Bitboard:
+    """Gomoku position on two bitmasks, with the same moves as State and undo()
+
+    set_piece() places a stone for the player to move and check_win() ends
+    the game when it made five in a row; candidates holds the bit indexes of
+    the empty cells within distance of a stone, in no particular order
+    """
+
+    def __init__(self, grid=None, piece='b', distance=DISTANCE):
+        self.stones = {'b': 0, 'w': 0}
+        self.piece = piece      # player to move
+        self.winner = None
+        self.game_over = False
+        self.history = []       # (r, c) of every set_piece(), for undo()
+        self.neighbours = neighbourhood(distance)
+        self.near = [0] * (SIZE * WIDTH)    # stones within distance of every cell
+        self.candidates = []
+        self.slot = [-1] * (SIZE * WIDTH)   # position of every cell in candidates, -1 if absent
+        if grid is not None:
+            for r in range(SIZE):
+                for c in range(SIZE):
+                    if grid[r][c] != '.':
+                        self.put(index(r, c), grid[r][c])
+
+    def occupied(self):
+        return self.stones['b'] | self.stones['w']
+
+    def get(self, r, c):
+        '''the piece on (r, c), '.' for none'''
+        bit = 1 << index(r, c)
+        if self.stones['b'] & bit:
+            return 'b'
+        if self.stones['w'] & bit:
+            return 'w'
+        return '.'
+
+    def get_grid(self):
+        return [[self.get(r, c) for c in range(SIZE)] for r in range(SIZE)]
+
+    def add(self, i):
+        self.slot[i] = len(self.candidates)
+        self.candidates.append(i)
+
+    def discard(self, i):
+        position = self.slot[i]
+        last = self.candidates.pop()
+        if last != i:
+            self.candidates[position] = last
+            self.slot[last] = position
+        self.slot[i] = -1
+
+    def put(self, i, piece):
+        '''place a stone of piece on bit index i and update the candidates around it'''
+        self.stones[piece] |= 1 << i
+        if self.slot[i] >= 0:
+            self.discard(i)
+        occupied = self.occupied()
+        near = self.near
+        for j in self.neighbours[i]:
+            near[j] += 1
+            if near[j] == 1 and not occupied >> j & 1:
+                self.add(j)
+
+    def take(self, i, piece):
+        '''remove the stone of piece on bit index i, the reverse of put()'''
+        self.stones[piece] &= ~(1 << i)
+        near = self.near
+        for j in self.neighbours[i]:
+            near[j] -= 1
+            if near[j] == 0 and self.slot[j] >= 0:
+                self.discard(j)
+        if near[i] > 0:
+            self.add(i)
+
+    def no_options(self):
+        #In the unlikely event that no one wins before board is filled
+        #Make white win since black moved first
+        self.game_over = True
+        self.winner = 'w'
+
+    # limit search size to only nearby grid
+    def get_options(self):
+        '''the candidate moves as (r, c) in row order, the center on an empty grid'''
+        if not self.candidates:
+            if self.occupied() == 0:
+                return [(SIZE // 2, SIZE // 2)]
+            self.no_options()
+        return [divmod(i, WIDTH) for i in sorted(self.candidates)]
+
+    def random_option(self):
+        '''a random candidate move as (r, c), None when there is none'''
+        if not self.candidates:
+            if self.occupied() == 0:
+                return (SIZE // 2, SIZE // 2)
+            self.no_options()
+            return None
+        return divmod(self.candidates[random.randrange(len(self.candidates))], WIDTH)
+
+    def set_piece(self, r, c):
+        i = index(r, c)
+        if self.occupied() >> i & 1:
+            return False
+        self.history.append((r, c))
+        self.put(i, self.piece)
+        if self.piece == 'b':
+            self.piece = 'w'
+        else:
+            self.piece = 'b'
+        return True
+
+    def check_win(self, r, c):
+        piece = self.get(r, c)
+        if piece != '.' and five(self.stones[piece], r, c):
+            self.winner = piece
+            self.game_over = True
+
+    def undo(self):
+        '''take back the last set_piece(), and the end of the game it caused'''
+        r, c = self.history.pop()
+        if self.piece == 'b':
+            self.piece = 'w'
+        else:
+            self.piece = 'b'
+        self.take(index(r, c), self.piece)
+        self.winner = None
+        self.game_over = False
+
+    def rollout(self):
+        '''play random moves until the game is over, return the winner'''
+        while not self.game_over:
+            option = self.random_option()
+            if option is None:
+                break
+            self.set_piece(*option)
+            self.check_win(*option)
+        return self.winner
@@ -4,7 +4,7 @@ from randplay import *
 from mcts import *
 
 class Board:
-    def __init__(self):
+    def __init__(self, iterations=None, seconds=None, parallel=None, workers=None):
         self.grid_size = 46
         self.start_x, self.start_y = 38, 55
         self.edge_size = self.grid_size // 2
@@ -14,6 +14,15 @@ class Board:
         self.game_over = False
         self.grid = []
         self.winning_pos = []
+        # search budget of every MCTS move, see MCTS.uct_search()
+        self.iterations = iterations
+        self.seconds = seconds
+        # 'root' or 'leaf' parallel MCTS on a warm process pool, None for one process
+        self.parallel = parallel
+        self.workers = workers
+        self.pool = searchPool(workers) if parallel is not None else None
+        # the MCTS of the game, kept from move to move, see get_search()
+        self.search = None
         for i in range(self.grid_count):
             self.grid.append(list("." * self.grid_count))
     def handle_key_event(self, e):
@@ -41,9 +50,18 @@ class Board:
                 self.piece = 'w'
             else:
                 self.piece = 'b'
+            if self.search is not None:
+                self.search.advance(r, c)
             return True
         return False
 
+    def get_search(self):
+        #the MCTS is created on the first AI move, later moves of both players
+        #advance its root so its statistics carry over to the next AI move
+        if self.search is None:
+            self.search = MCTS(self.grid, self.piece, self.pool, self.parallel, self.workers)
+        return self.search
+
     def autoplay(self):
         #Two automatic players against each other
         #TODO: Modify player2 (not player1) to use MCTS instead of Randplay
@@ -60,9 +78,17 @@ class Board:
         if not self.game_over:
             #TODO: Modify player2 to use MCTS instead of Randplay
             start = time.time()
-            player2 = MCTS(self.grid, self.piece)       # constructor 
-            r,c = player2.uct_search()                  # make a move
+            player2 = self.get_search()                 # kept across moves 
+            move, stats = player2.uct_search(self.iterations, self.seconds)   # make a move
+            if move is None:
+                # no move left: the search ended the game, see Bitboard.no_options()
+                print("AI", self.piece, "has no move")
+                self.game_over = True
+                self.winner = player2.board.winner
+                return
+            r, c = move
             print("AI", self.piece, "move: (", r, ",", c, ")")
+            print("search", stats)
             end = time.time()
             print ("time cost of AI is: ", end - start)
             self.set_piece(r, c)
@@ -74,9 +100,17 @@ class Board:
         #Optional: Change this to MCTS AI and see whether you can reward
 
             start = time.time()
-            player1 = MCTS(self.grid, self.piece)       # constructor 
-            r,c = player1.uct_search()                  # make a move            
+            player1 = self.get_search()                 # kept across moves 
+            move, stats = player1.uct_search(self.iterations, self.seconds)   # make a move
+            if move is None:
+                # no move left: the search ended the game, see Bitboard.no_options()
+                print("semi-AI", self.piece, "has no move")
+                self.game_over = True
+                self.winner = player1.board.winner
+                return
+            r, c = move
             print("semi-AI", self.piece, "move: (", r, ",", c, ")")  
+            print("search", stats)
             end = time.time()
             print ("time cost of AI is: ", end - start)
             self.set_piece(r, c)
@@ -155,6 +189,7 @@ class Board:
         self.winner = None
         self.game_over = False
         self.winning_pos = []
+        self.search = None
     def draw(self, screen):
         pygame.draw.rect(screen, (185, 122, 87),
                          [self.start_x - self.edge_size, self.start_y - self.edge_size,
@@ -179,8 +214,8 @@ class Board:
                     x = self.start_x + c * self.grid_size
                     y = self.start_y + r * self.grid_size
                     pygame.draw.circle(screen, color, [x, y], self.grid_size // 2)
-        #draw the winning line of five pieces
-        if self.game_over:
+        #draw the winning line of five pieces, a game without moves left has none
+        if self.game_over and self.winning_pos:
             start_pos = [self.start_x + self.winning_pos[0][1]*self.grid_size, self.start_y + self.winning_pos[0][0]*self.grid_size]
             end_pos = [self.start_x + self.winning_pos[1][1]*self.grid_size, self.start_y + self.winning_pos[1][0]*self.grid_size]
             pygame.draw.line(screen, (140, 40, 0), start_pos, end_pos, 6)
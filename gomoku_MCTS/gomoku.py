@@ -1,17 +1,18 @@
 from __future__ import absolute_import, division, print_function
+import argparse
 import pygame
 from pygame.locals import *
 from board import *
 
 class Gomoku():
-    def __init__(self):
+    def __init__(self, iterations=None, seconds=None, parallel=None, workers=None):
         pygame.init()
         self.screen = pygame.display.set_mode((530, 550))
         pygame.display.set_caption("Gomoku")
         self.clock = pygame.time.Clock()
         self.font = pygame.font.SysFont("ariel",18)
         self.going = True
-        self.board = Board()
+        self.board = Board(iterations, seconds, parallel, workers)
         self.auto = False
         self.semiauto = True
     def loop(self):
@@ -54,5 +55,14 @@ class Gomoku():
         pygame.display.update()
 
 if __name__ == '__main__':
-    game = Gomoku()
+    parser = argparse.ArgumentParser(description="gomoku against a Monte Carlo tree search AI")
+    parser.add_argument('--iterations', type=int, default=None,
+        help="MCTS iterations per move, %d without --seconds" % ITERATIONS)
+    parser.add_argument('--seconds', type=float, default=None,
+        help="MCTS thinking time per move; with --iterations the search stops at either")
+    parser.add_argument('--parallel', choices=('root', 'leaf'), default=None,
+        help="search on a process pool: a tree per worker, or one tree with rollouts on the workers")
+    parser.add_argument('--workers', type=int, default=None, help="pool size, the CPU count by default")
+    args = parser.parse_args()
+    game = Gomoku(args.iterations, args.seconds, args.parallel, args.workers)
     game.loop()
@@ -1,207 +1,301 @@
  # MCTS
 # ZHAOKAI XU
-# zhx121@ucsd.edu 
+# zhx121@ucsd.edu
 
 from __future__ import absolute_import, division, print_function
 from math import sqrt, log
-import random,copy
+import os
+import random
 import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from bitboard import Bitboard
+
+# iterations of uct_search() when it is given no budget
+ITERATIONS = 100
+# rollouts of every new state per worker with parallel='leaf'
+LEAF_ROLLOUTS = 4
+
+def opponent(piece):
+    if piece == 'b':
+        return 'w'
+    return 'b'
+
+# one warm pool shared by every search, see searchPool()
+_pool = None
+
+def searchPool(workers=None):
+    '''process pool for parallel MCTS, created once and kept warm across moves'''
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=workers)
+    return _pool
+
+def _rootSearch(grid, player, iterations, seconds, seed):
+    '''run in a pool worker: search the grid with a tree of its own, return the
+    (visits, rewards) of its root moves and the iterations, rollouts, size and depth'''
+    random.seed(seed)
+    search = MCTS(grid, player)
+    done = search.think(iterations, seconds)
+    size, depth = search.tree_size()
+    visits = dict((child.action, (child.visit, child.reward)) for child in search.root.children)
+    return visits, done, search.rollouts, size, depth
+
+def _leafRollouts(grid, player, count, seed):
+    '''run in a pool worker: the winners of count rollouts of the grid, as {winner: count}'''
+    random.seed(seed)
+    board = Bitboard(grid, player)
+    wins = {}
+    for i in range(count):
+        winner = board.rollout()
+        wins[winner] = wins.get(winner, 0) + 1
+        while board.history:
+            board.undo()
+    return wins
 
 # state represent the state of the grid in a search MCT tree
 # work like node in a tree
-# init current state to be the root
+# a state only keeps the move that leads to it, its grid is the root grid
+# with the moves of the path from the root played on it
 ######################################################################################
 class State:
-    def __init__(self, grid, player):
-        self.grid = grid
-        self.piece = player
-        self.parent = None 
-        self.reward = 0;        # number of wins
+    __slots__ = ('piece', 'parent', 'reward', 'visit', 'action', 'game_over', 'expanded',
+        'children', 'possible_actions', 'winner')
+
+    def __init__(self, action, piece, parent=None):
+        self.piece = piece          # the player who played action
+        self.parent = parent
+        self.reward = 0;        # number of wins of piece
         self.visit = 0;         # number of times visited
-        self.action = None      # how to reach this state from prev state, a tuple(r,c)
+        self.action = action      # how to reach this state from prev state, a tuple(r,c)
         self.game_over = False     # terminate only if one won
-        self.expanded = False      # try all possible actions      
-        self.children = []          # # list of child states    
-        
-        self.maxActions=0
-        self.actionCounter=0
-        self.possible_actions = []  # list of tuples
-        self.winner =None
+        self.expanded = False      # try all possible actions
+        self.children = []          # # list of child states
 
+        self.possible_actions = None  # list of tuples not tried yet, from the board on the first visit
+        self.winner =None
 
-# limit search size to only nearby grid
-    def get_options(self, grid):  
-        #collect all occupied spots
-        current_pcs = []
-        for r in range(len(grid)):
-            for c in range(len(grid)):
-                if not grid[r][c] == '.':
-                    current_pcs.append((r,c))
-
-        #At the beginning of the game, curernt_pcs is empty
-        if not current_pcs:
-            return [(10//2, 10//2)]
-
-        #Reasonable moves should be close to where the current pieces are
-        #Think about what these calculations are doing
-        #Note: min(list, key=lambda x: x[0]) picks the element with the min value on the first dimension
-        min_r = max(0, min(current_pcs, key=lambda x: x[0])[0]-1)
-        max_r = min(10, max(current_pcs, key=lambda x: x[0])[0]+1)
-        min_c = max(0, min(current_pcs, key=lambda x: x[1])[1]-1)
-        max_c = min(10, max(current_pcs, key=lambda x: x[1])[1]+1)
-        #Options of reasonable next step moves
-        options = []
-        for i in range(min_r, max_r+1):
-            for j in range(min_c, max_c+1):
-                if not (i, j) in current_pcs:
-                    options.append((i,j))
-        if len(options) == 0:
-            #In the unlikely event that no one wins before board is filled
-            #Make white win since black moved first
-            self.game_over = True
-            self.winner = 'w'
-        return options
-
-    def make_move(self):
-        return random.choice(self.get_options(self.grid))
-    
-    def get_continuous_count(self, r, c, dr, dc):
-        piece = self.grid[r][c]
-        result = 0
-        i = 1
-        while True:
-            new_r = r + dr * i
-            new_c = c + dc * i
-            if 0 <= new_r < 11 and 0 <= new_c < 11:
-                if self.grid[new_r][new_c] == piece:
-                    result += 1
-                else:
-                    break
-            else:
-                break
-            i += 1
-        return result
-
-    def check_win(self, r, c):
-        n_count = self.get_continuous_count(r, c, -1, 0)
-        s_count = self.get_continuous_count(r, c, 1, 0)
-        e_count = self.get_continuous_count(r, c, 0, 1)
-        w_count = self.get_continuous_count(r, c, 0, -1)
-        se_count = self.get_continuous_count(r, c, 1, 1)
-        nw_count = self.get_continuous_count(r, c, -1, -1)
-        ne_count = self.get_continuous_count(r, c, -1, 1)
-        sw_count = self.get_continuous_count(r, c, 1, -1)
-        if (n_count + s_count + 1 >= 5) or (e_count + w_count + 1 >= 5) or \
-                (se_count + nw_count + 1 >= 5) or (ne_count + sw_count + 1 >= 5):
-            self.winner = self.grid[r][c]
-            self.game_over = True
-
-    def set_piece(self, r, c):
-        if self.grid[r][c] == '.':
-            self.grid[r][c] = self.piece
-            if self.piece == 'b':
-                self.piece = 'w'
-            else:
-                self.piece = 'b'
-            return True
-        return False
-
-# Roll out for default policy
-#'b' player wins, update 'w' player reward value along the path: {'b':0, 'w':1}
-#'w' player store, update 'b' player reward value along the path: {'b':1, 'w':0}
-    def rollout(self,state):
-        # take a random action each time until game over
-        while not self.game_over:
-            r,c = self.make_move()
-            self.set_piece(r,c)
-            self.check_win(r,c)        
-
-        return self.winner
-
-# MCTS is used to process the MCTS 
+# MCTS is used to process the MCTS
 # like a tree class, containing the root state
 ######################################################################################
 class MCTS:
-  
-    def __init__(self, grid, player):
+
+    def __init__(self, grid, player, pool=None, parallel='root', workers=None):
         self.grid = grid
         self.piece = player
-        self.root = State( grid, player)
+        # with a process pool, parallel='root' searches one tree per worker and
+        # adds up the visits of their root moves, parallel='leaf' keeps one tree
+        # and runs LEAF_ROLLOUTS rollouts per worker from every new state
+        self.pool = pool
+        self.parallel = parallel
+        self.workers = workers or os.cpu_count() or 1
+        # scratch board: every iteration plays the moves down the tree and the
+        # rollout on it, then takes them back to the root grid
+        self.board = Bitboard(grid, player)
+        self.root = State(None, opponent(player))
+        self.rollouts = 0       # random playouts run by iterate()
+
+    def advance(self, r, c):
+        '''play (r, c), by either player, for real: its state becomes the root with
+        the statistics of its subtree, and the rest of the tree is dropped'''
+        child = None
+        for state in self.root.children:
+            if state.action == (r, c):
+                child = state
+        if child is None:
+            # a move the search has not tried yet
+            child = State((r, c), self.board.piece)
+        child.parent = None
+        self.root = child
+        self.board.set_piece(r, c)
+        self.board.check_win(r, c)
+        # the move stays on the board: iterations take back their moves up to here
+        del self.board.history[:]
+        self.grid = self.board.get_grid()
+        self.piece = self.board.piece
+
+    def path(self, state):
+        '''the moves from the root to state'''
+        actions = []
+        while state.parent is not None:
+            actions.append(state.action)
+            state = state.parent
+        actions.reverse()
+        return actions
+
+    def replay(self, state):
+        '''a new Bitboard of the grid of state, replayed from the root'''
+        board = Bitboard(self.grid, self.piece)
+        for r, c in self.path(state):
+            board.set_piece(r, c)
+            board.check_win(r, c)
+        return board
 
+    def tree_size(self):
+        '''(number of states, depth of the deepest one) of the tree below the root'''
+        size = 0
+        depth = 0
+        level = [self.root]
+        while level:
+            size += len(level)
+            depth += 1
+            level = [child for state in level for child in state.children]
+        return size, depth - 1
 
 # core fucniton, wrapped up selection, expansion, simulation, backpropagation
-# return the best move , a tuple (r,c)
-    def uct_search(self):
-        # number of iteration limited within 15 seconds 
-        for i in range(100): 
-            state = self.tree_policy(self.root)
-
-            ### Super crucial to make a deep copy of the child state.  
-            # And call copyState .rollout() instead of state.rollout()       Debug 5+hrs >_<
-            # so that will not modify inner properties of child states
-            # only want rollout()/default policy() to return the winner in curr state simulation
-            copyState = copy.deepcopy(state)
-            winner = copyState.rollout(copyState)
-
-            self.backpropagation(state, winner)
-         
-        # calc the best child action under curr root state
-        maxChild=None
-        val = 0
-        for child in self.root.children:
-            if val < ( child.reward / child.visit ):
-                maxChild =  child 
-                val = ( child.reward / child.visit )
-
-        print ("best action", maxChild.action)
-        print ("best child.reward ",maxChild.reward ,"best child.visit", maxChild.visit)
-        return maxChild.action
-
-# Tree policy: expand OR find the best child 
-    def tree_policy(self, state): 
+# return the best move , a tuple (r,c), and the statistics of the search
+    def uct_search(self, iterations=None, seconds=None):
+        # iterate until either budget runs out, the iterations or the seconds,
+        # ITERATIONS times without any; at least once
+        if iterations is None and seconds is None:
+            iterations = ITERATIONS
+        start = time.perf_counter()
+        rollouts = self.rollouts
+        # iterations through the root carried over from earlier moves
+        reused = self.root.visit
+        if self.pool is not None and self.parallel == 'root':
+            visits, done, size, depth = self.root_parallel(iterations, seconds)
+        else:
+            done = self.think(iterations, seconds)
+            visits = dict((child.action, (child.visit, child.reward)) for child in self.root.children)
+            size, depth = self.tree_size()
+        elapsed = time.perf_counter() - start
+
+        # calc the best child action under curr root state: the most visited,
+        # which a few lucky rollouts cannot make
+        maxAction=None
+        for action in visits:
+            if maxAction is None or visits[action] > visits[maxAction]:
+                maxAction = action
+
+        stats = {
+            'iterations': done,
+            'seconds': elapsed,
+            'tree_size': size,
+            'max_depth': depth,
+            'rollouts': self.rollouts - rollouts,
+            'rollouts_per_second': (self.rollouts - rollouts) / elapsed if elapsed > 0 else 0.0,
+            'reused': reused,
+        }
+        if maxAction is None:
+            return None, stats
+        print ("best action", maxAction)
+        print ("best child.reward ",visits[maxAction][1] ,"best child.visit", visits[maxAction][0])
+        return maxAction, stats
+
+    def think(self, iterations, seconds):
+        '''iterate within the budget, return the number of iterations'''
+        deadline = None if seconds is None else time.perf_counter() + seconds
+        done = 0
+        while iterations is None or done < iterations:
+            if deadline is not None and done > 0 and time.perf_counter() >= deadline:
+                break
+            self.iterate()
+            done += 1
+        return done
+
+    def root_parallel(self, iterations, seconds):
+        '''search the root on the pool with one tree per worker, splitting the iterations:
+        (visits and rewards of the root moves added up, iterations, tree size, max depth)'''
+        futures = []
+        for i in range(self.workers):
+            share = None
+            if iterations is not None:
+                share = iterations // self.workers + (i < iterations % self.workers)
+                if share == 0:
+                    continue
+            futures.append(self.pool.submit(_rootSearch, self.grid, self.piece, share, seconds,
+                random.getrandbits(32)))
+        visits = {}
+        done = size = depth = 0
+        for future in futures:
+            treeVisits, treeDone, rollouts, treeSize, treeDepth = future.result()
+            for action, (visit, reward) in treeVisits.items():
+                total = visits.get(action, (0, 0))
+                visits[action] = (total[0] + visit, total[1] + reward)
+            done += treeDone
+            self.rollouts += rollouts
+            size += treeSize
+            depth = max(depth, treeDepth)
+        return visits, done, size, depth
+
+    def leaf_rollouts(self):
+        '''the winners of LEAF_ROLLOUTS rollouts per worker from the board, as {winner: count}'''
+        grid = self.board.get_grid()
+        futures = [self.pool.submit(_leafRollouts, grid, self.board.piece, LEAF_ROLLOUTS,
+            random.getrandbits(32)) for i in range(self.workers)]
+        wins = {}
+        for future in futures:
+            for winner, count in future.result().items():
+                wins[winner] = wins.get(winner, 0) + count
+                self.rollouts += count
+        return wins
+
+    def iterate(self):
+        '''one iteration of selection, expansion, simulation and backpropagation'''
+        state = self.tree_policy(self.root)
+        if self.pool is not None and self.parallel == 'leaf' and not state.game_over:
+            for winner, count in self.leaf_rollouts().items():
+                self.backpropagation(state, winner, count)
+        else:
+            self.backpropagation(state, self.rollout(state))
+        # take back the moves of this iteration
+        while self.board.history:
+            self.board.undo()
+
+# Tree policy: expand OR find the best child, playing its moves on the board
+    def tree_policy(self, state):
 
         while state.game_over is False:
-            if state.expanded is False:    
-                return self.expansion(state) 
-            else:      
+            if state.expanded is False:
+                return self.expansion(state)
+            else:
                 state = self.best_child(state)
+                self.board.set_piece(*state.action)
 
         return state
-        
+
 # expand to create a new child and connect to the state
     def expansion(self, state):
-        # get all reasonable moves (r,c) of a state 
-        if len(state.possible_actions) is 0:
-            state.possible_actions = copy.deepcopy( state.get_options(state.grid) )    
-            state.maxActions = len( state.possible_actions)
- 
+        # get all reasonable moves (r,c) of a state
+        if state.possible_actions is None:
+            state.possible_actions = self.board.get_options()
+            if len(state.possible_actions) == 0:
+                # a full board ends the game, see Bitboard.get_options()
+                state.game_over = True
+                state.winner = self.board.winner
+                return state
+
         #create a new child state
         newAction =  state.possible_actions.pop()
-        state.actionCounter += 1
- 
-        newPiece = ''
-        if (state.piece == 'b'):
-            newPiece =  'w'
-        else:
-            newPiece =  'b'
-        newGrid = copy.deepcopy(state.grid)
-        newGrid[newAction[0]][newAction[1]]=newPiece 
-        newChild =  State( newGrid, newPiece)
-        newChild.action = newAction
+        newChild =  State(newAction, self.board.piece, state)
+        self.board.set_piece(*newAction)
+        self.board.check_win(*newAction)
+        if self.board.game_over:
+            newChild.game_over = True
+            newChild.winner = self.board.winner
 
         #connect to parent state
-        newChild.parent = state
         state.children.append(newChild)
-    
+
         #add all possible actions into children states
-        if state.actionCounter == state.maxActions:
+        if len(state.possible_actions) == 0:
             state.expanded = True
 
         return newChild
 
+# Roll out for default policy
+# random moves on the board from the state until game over, return the winner
+    def rollout(self, state):
+        if state.game_over:
+            return state.winner
+        self.rollouts += 1
+        return self.board.rollout()
+
 # compute the formular to find max child of the given state
     def best_child(self, state):
-        max_ucb=0
+        # every UCB can be 0, e.g. a lone child that never won, so start below it
+        max_ucb=float('-inf')
         ucb_child=None
         for child in state.children:
             ucb = ( child.reward / child.visit ) + sqrt( (log(state.visit) / child.visit) )
@@ -211,9 +305,11 @@ class MCTS:
         return ucb_child
 
 
-    def backpropagation(self, state, result):
+#'b' player wins, update 'b' player reward value along the path: {'b':1, 'w':0}
+#'w' player wins, update 'w' player reward value along the path: {'b':0, 'w':1}
+    def backpropagation(self, state, result, count=1):
         while state is not None:
-            state.visit += 1
-            if state.piece != result:
-                state.reward += 1
+            state.visit += count
+            if state.piece == result:
+                state.reward += count
             state = state.parent